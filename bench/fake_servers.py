@@ -0,0 +1,268 @@
+"""
+벤치마크용 로컬 가짜 서버입니다.
+google.serper.dev(search/images, 이미지 파일), OpenAI chat completions(스트리밍 포함),
+graph.threads.net(/threads, /threads_publish, 컨테이너 상태 조회)를 흉내 냅니다.
+각 서버는 지연 시간을 설정할 수 있어 네트워크 없이 파이프라인 처리량을 측정할 수 있습니다.
+"""
+import re
+import json
+import time
+import struct
+import random
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+SAMPLE_SNIPPETS = [
+    "OpenAI announced a new reasoning model with lower latency for developers.",
+    "Google DeepMind published research on efficient long-context attention.",
+    "Nvidia reported record data center revenue driven by AI accelerators.",
+    "Anthropic released updated safety guidelines for enterprise AI agents.",
+    "Meta open-sourced a new multilingual speech model for 100 languages.",
+    "Startups raised billions this quarter for AI infrastructure tooling.",
+    "Regulators in the EU clarified rules for general purpose AI models.",
+    "Microsoft expanded Copilot features across its productivity suite.",
+]
+
+SAMPLE_POST_LINES = [
+    "안녕 #AI 스치니들! 👋",
+    "오늘 AI 뉴스 중에 눈에 띄는 거 하나 공유할게 ☘️",
+    "1️⃣ 새 추론 모델이 나왔는데 속도가 꽤 빨라졌대",
+    "2️⃣ 긴 문맥 처리 연구도 계속 나오고 있어",
+    "내가 보기엔 올해는 에이전트가 진짜 대세일 듯?",
+    "다들 어떻게 생각해? 댓글로 알려줘 👐",
+    "스하리 환영이야~",
+]
+
+FAKE_PNG = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">IIBBBBB", 1080, 1080, 8, 2, 0, 0, 0) \
+    + b"\x00" * 200_000
+
+
+class FakeServer:
+    """
+    ThreadingHTTPServer를 백그라운드 스레드로 띄우는 공통 베이스입니다.
+    """
+
+    handler_class = None
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(self.handler_class):
+            fake = server
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake = None
+
+    def log_message(self, *args):
+        pass
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_json(self, data, status: int = 200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SerperHandler(JSONHandler):
+    def do_POST(self):
+        self.fake.count()
+        body = self.read_body()
+        query = parse_qs(urlparse(self.path).query)
+        params = json.loads(body) if body else {k: v[0] for k, v in query.items()}
+        time.sleep(self.fake.latency)
+        q = params.get("q", "")
+        num = int(params.get("num", 10))
+        if urlparse(self.path).path.endswith("/images"):
+            # 이미지 사전 검증이 네트워크 없이 동작하도록 가짜 서버 자신이 이미지를 제공
+            images = [{"title": f"{q} image {i}", "imageUrl": f"{self.fake.url}/img/{i}.png",
+                       "imageWidth": 1080, "imageHeight": 1080} for i in range(num)]
+            return self.send_json({"images": images})
+        organic = []
+        for i in range(num):
+            snippet = SAMPLE_SNIPPETS[(hash(q) + i) % len(SAMPLE_SNIPPETS)]
+            organic.append({"title": f"{q} headline {i}", "link": f"https://example.com/news/{i}",
+                            "snippet": f"{snippet} ({q} #{i})", "date": f"{i + 1} hours ago"})
+        self.send_json({"organic": organic})
+
+    def do_GET(self):
+        # /img/<n>.png: 1080x1080 PNG 헤더 뒤에 채움 바이트를 붙인 가짜 이미지 (Range 요청 지원)
+        self.fake.count()
+        time.sleep(self.fake.latency)
+        body = FAKE_PNG
+        start, end = 0, len(body) - 1
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if match:
+            start = int(match.group(1))
+            end = min(end, int(match.group(2))) if match.group(2) else end
+        self.send_response(206 if match else 200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(end - start + 1))
+        if match:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        self.end_headers()
+        self.wfile.write(body[start:end + 1])
+
+
+class FakeSerper(FakeServer):
+    handler_class = SerperHandler
+
+
+class OpenAIHandler(JSONHandler):
+    def do_POST(self):
+        self.fake.count()
+        request = json.loads(self.read_body() or b"{}")
+        n = int(request.get("n") or 1)
+        model = request.get("model", "gpt-4o-mini")
+        time.sleep(self.fake.latency)
+        texts = [self.fake.make_post() for _ in range(n)]
+        usage = {"prompt_tokens": 1800, "completion_tokens": 150, "total_tokens": 1950}
+        if not request.get("stream"):
+            return self.send_json({
+                "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()),
+                "model": model, "usage": usage,
+                "choices": [{"index": i, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop", "logprobs": None} for i, text in enumerate(texts)],
+            })
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+        text = texts[0]
+        try:
+            for start in range(0, len(text), self.fake.chunk_chars):
+                delta = {"content": text[start:start + self.fake.chunk_chars]}
+                if start == 0:
+                    delta["role"] = "assistant"
+                self.write_event({"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                                  "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                time.sleep(self.fake.token_delay)
+            self.write_event({"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                              "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self.write_event({"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                                  "model": model, "choices": [], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 조기 중단(early cutoff)한 경우
+            pass
+        self.close_connection = True
+
+    def do_GET(self):
+        # LLM_WARMUP_REQUEST가 보내는 모델 목록 요청
+        self.fake.count()
+        time.sleep(self.fake.latency)
+        self.send_json({"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "bench"}]})
+
+    def write_event(self, data):
+        self.wfile.write(b"data: " + json.dumps(data).encode("utf-8") + b"\n\n")
+        self.wfile.flush()
+
+
+class FakeOpenAI(FakeServer):
+    """
+    latency: 첫 토큰까지의 지연, token_delay: 스트리밍 청크 사이 지연
+    long_ratio: 500자를 넘는 긴 게시물을 돌려줄 확률 (재생성/조기 중단 경로 측정용)
+    """
+
+    handler_class = OpenAIHandler
+
+    def __init__(self, latency: float = 0.0, token_delay: float = 0.0, chunk_chars: int = 8, long_ratio: float = 0.0):
+        super().__init__(latency)
+        self.token_delay = token_delay
+        self.chunk_chars = chunk_chars
+        self.long_ratio = long_ratio
+        self._random = random.Random(42)
+
+    @property
+    def url(self) -> str:
+        return super().url + "/v1"
+
+    def make_post(self) -> str:
+        # 이력 기반 중복 검사에 걸리지 않도록 게시물마다 충분히 다른 내용을 생성
+        with self._lock:
+            lines = self._random.sample(SAMPLE_POST_LINES[1:-1], 3) + self._random.sample(SAMPLE_SNIPPETS, 2)
+            long_post = self._random.random() < self.long_ratio
+            tail = " ".join(f"{self._random.getrandbits(32):08x}" for _ in range(4))
+        body = "\n".join(lines * (6 if long_post else 1))
+        return f"{SAMPLE_POST_LINES[0]}\n{body}\n{tail}\n{SAMPLE_POST_LINES[-1]}"
+
+
+class ThreadsHandler(JSONHandler):
+    def do_POST(self):
+        self.fake.count()
+        self.read_body()
+        time.sleep(self.fake.latency)
+        if self.path.split("?")[0].endswith("/threads_publish"):
+            return self.send_json({"id": uuid.uuid4().hex})
+        container_id = uuid.uuid4().hex
+        with self.fake._lock:
+            self.fake.containers[container_id] = time.time() + self.fake.processing_time
+        self.send_json({"id": container_id})
+
+    def do_GET(self):
+        self.fake.count()
+        time.sleep(self.fake.latency)
+        container_id = urlparse(self.path).path.rstrip("/").split("/")[-1]
+        if container_id == "threads_publishing_limit":
+            return self.send_json({"data": [{"quota_usage": 0,
+                                             "config": {"quota_total": self.fake.quota_total,
+                                                        "quota_duration": 86400}}]})
+        with self.fake._lock:
+            ready_at = self.fake.containers.get(container_id)
+        if ready_at is None:
+            return self.send_json({"id": container_id, "status": "FINISHED"})
+        status = "FINISHED" if time.time() >= ready_at else "IN_PROGRESS"
+        self.send_json({"id": container_id, "status": status})
+
+
+class FakeThreads(FakeServer):
+    """
+    processing_time: 컨테이너가 FINISHED 상태가 되기까지 걸리는 시간
+    quota_total: threads_publishing_limit이 알려줄 24시간 게시 한도
+    """
+
+    handler_class = ThreadsHandler
+
+    def __init__(self, latency: float = 0.0, processing_time: float = 0.0, quota_total: int = 10 ** 9):
+        super().__init__(latency)
+        self.processing_time = processing_time
+        self.quota_total = quota_total
+        self.containers = {}
+
+    @property
+    def url(self) -> str:
+        return super().url + "/v1.0"
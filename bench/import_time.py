@@ -0,0 +1,121 @@
+"""
+콜드 스타트 임포트 시간 벤치마크입니다. 매 측정마다 새 인터프리터에서 모듈을 임포트합니다.
+
+    python -m bench.import_time                                   # src.app, src.bot 임포트 시간 측정
+    python -m bench.import_time --output bench/import_baseline.json  # 기준값 저장
+    python -m bench.import_time --check bench/import_baseline.json   # 기준값 대비 회귀 검사 (CI)
+
+무거운 모듈(openai, langchain)이 임포트 시점에 함께 로드되면 지연 임포트가 깨진 것으로 보고 실패합니다.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+MODULES = ("src.app", "src.bot")
+# 임포트 시점에 로드되면 안 되는 모듈 (처음 실행할 때 bot.load_dependencies()에서 로드)
+HEAVY_MODULES = ("openai", "langchain_openai", "langchain_core", "langchain_community")
+
+MEASURE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter() - started
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+started = time.perf_counter()
+import src.bot
+src.bot.load_dependencies()
+warmed = time.perf_counter() - started
+print(json.dumps({{"import": imported, "heavy": heavy, "warm": warmed}}))
+"""
+
+
+def measure(module: str, env: dict) -> dict:
+    code = MEASURE.format(module=module, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def median(values: list) -> float:
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def run_module(module: str, runs: int, env: dict) -> dict:
+    samples = [measure(module, env) for _ in range(runs)]
+    imports = [sample["import"] for sample in samples]
+    return {
+        "module": module,
+        "runs": runs,
+        "median_seconds": round(median(imports), 4),
+        "max_seconds": round(max(imports), 4),
+        "warm_seconds": round(median([sample["warm"] for sample in samples]), 4),
+        "heavy_loaded": sorted({name for sample in samples for name in sample["heavy"]}),
+    }
+
+
+def check_against(results: list, baseline_path: str, tolerance: float) -> list:
+    """
+    무거운 모듈이 임포트 시점에 로드되었거나, 중앙값이 기준값보다 tolerance 비율 이상 느려진 모듈 목록을 반환합니다.
+    """
+    with open(baseline_path) as f:
+        baseline = {entry["module"]: entry for entry in json.load(f)["modules"]}
+    regressions = []
+    for result in results:
+        if result["heavy_loaded"]:
+            regressions.append(f"{result['module']}: heavy modules imported eagerly {result['heavy_loaded']}")
+        expected = baseline.get(result["module"])
+        if not expected:
+            continue
+        ceiling = expected["median_seconds"] * (1 + tolerance)
+        if result["median_seconds"] > ceiling:
+            regressions.append(
+                f"{result['module']}: {result['median_seconds']}s > {ceiling:.4f}s "
+                f"(baseline {expected['median_seconds']}s)"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Cold-start import time benchmark")
+    parser.add_argument("--module", action="append", help="module to import (repeatable)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="write results JSON to this file")
+    parser.add_argument("--check", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed slowdown vs baseline")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    env.update({
+        "SERPER_API_KEY": env.get("SERPER_API_KEY", "bench"),
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY", "bench"),
+        # 측정 중 백그라운드 미리 임포트가 끼어들지 않도록 끔
+        "PREWARM_IMPORTS": "false",
+        "DATA_DIR": tempfile.mkdtemp(prefix="threads-bot-import-"),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    results = []
+    for module in args.module or MODULES:
+        result = run_module(module, args.runs, env)
+        results.append(result)
+        print(json.dumps(result), file=sys.stderr)
+
+    output = json.dumps({"modules": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+    if args.check:
+        regressions = check_against(results, args.check, args.tolerance)
+        for regression in regressions:
+            print("[-] 임포트 시간 회귀:", regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
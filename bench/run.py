@@ -0,0 +1,184 @@
+"""
+오프라인 벤치마크 시나리오입니다. 실제 API 키나 네트워크 없이 bot.main()의 처리량을 측정합니다.
+
+    python -m bench.run                         # 1, 10, 100 주제 시나리오 실행
+    python -m bench.run --topics 10 --runs 3    # 특정 시나리오만 실행
+    python -m bench.run --output bench/baseline.json      # 기준값 저장
+    python -m bench.run --check bench/baseline.json       # 기준값 대비 회귀 검사
+    python -m bench.run --check base_output.json          # 같은 머신에서 측정한 기준 커밋 결과와 비교 (CI)
+
+가짜 서버 주소를 환경 변수로 주입한 뒤에 src.bot을 임포트해야 하므로,
+src 모듈 임포트는 setup_environment() 이후에 이루어집니다.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import tracemalloc
+import contextlib
+
+from bench.fake_servers import FakeSerper, FakeOpenAI, FakeThreads
+
+SCENARIOS = (1, 10, 100)
+
+
+def setup_environment(args) -> dict:
+    servers = {
+        "serper": FakeSerper(latency=args.serper_latency).start(),
+        "openai": FakeOpenAI(latency=args.openai_latency, token_delay=args.token_delay,
+                             long_ratio=args.long_ratio).start(),
+        "threads": FakeThreads(latency=args.threads_latency, processing_time=args.processing_time).start(),
+    }
+    os.environ.update({
+        "SERPER_BASE_URL": servers["serper"].url,
+        "SERPER_API_KEY": "bench",
+        "OPENAI_BASE_URL": servers["openai"].url,
+        "OPENAI_API_KEY": "bench",
+        "THREADS_BASE_URL": servers["threads"].url,
+        "ACCESS_TOKEN": "bench",
+        "USER_ID": "bench",
+        # 같은 가짜 뉴스가 반복되므로 중복 건너뛰기는 끄고 전체 경로를 측정
+        "SKIP_DUPLICATE_NEWS": "false",
+        # 같은 이유로 생성 캐시도 끄고 매번 LLM 호출 경로를 측정
+        "GENERATION_CACHE": "false",
+        "NEAR_DUP_DISTANCE": "1",
+        # 게시 한도 분산은 처리량 측정 대상이 아니므로 버스트를 충분히 크게 둠
+        "THREADS_PUBLISH_BURST": "1000000",
+        "THREADS_API_BURST": "1000000",
+        # 가짜 컨테이너는 --processing-time 뒤에 준비되므로 첫 상태 확인을 짧게 둠
+        "CONTAINER_POLL_INITIAL": "0.1",
+        "DATA_DIR": tempfile.mkdtemp(prefix="threads-bot-bench-"),
+    })
+    return servers
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_scenario(topic_count: int, runs: int, track_memory: bool, verbose: bool = False) -> dict:
+    from src import bot, metrics, search_cache
+
+    # 지연 임포트 비용은 bench.import_time에서 따로 측정하므로 처리량 측정 전에 미리 로드
+    # (워커 시작 시와 같이 LLM 클라이언트도 미리 생성)
+    bot.prewarm()
+    topics = [f"AI Topic {i}" for i in range(topic_count)]
+    durations = []
+    stage_durations = {}
+    peak_memory = 0
+    for _ in range(runs):
+        # 매 실행마다 검색 캐시를 비워 실제 검색 경로도 측정
+        search_cache.set_cache(search_cache.BACKENDS[search_cache.SEARCH_CACHE_BACKEND]())
+        if track_memory:
+            tracemalloc.start()
+        trace = metrics.RunTrace()
+        started = time.perf_counter()
+        # 봇의 진행 로그는 기본적으로 숨기고 결과 JSON만 출력
+        with open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(sys.stdout if verbose else devnull), \
+                metrics.use_trace(trace):
+            bot.main(topics)
+        durations.append(time.perf_counter() - started)
+        if track_memory:
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        for span in trace.spans:
+            stage_durations.setdefault(span["stage"], []).append(span["duration"])
+
+    average = sum(durations) / len(durations)
+    result = {
+        "topics": topic_count,
+        "runs": runs,
+        "avg_run_seconds": round(average, 4),
+        "runs_per_minute": round(60 / average, 2) if average else 0.0,
+        "topics_per_minute": round(60 * topic_count / average, 2) if average else 0.0,
+        "stages": {
+            stage: {
+                "count": len(values),
+                "p50": round(percentile(values, 50), 4),
+                "p99": round(percentile(values, 99), 4),
+            }
+            for stage, values in sorted(stage_durations.items())
+        },
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    if track_memory:
+        result["peak_traced_mb"] = round(peak_memory / (1024 * 1024), 2)
+    return result
+
+
+def check_against(results: list, baseline_path: str, tolerance: float) -> list:
+    """
+    기준값보다 처리량(topics_per_minute)이 tolerance 비율 이상 떨어진 시나리오 목록을 반환합니다.
+    """
+    with open(baseline_path) as f:
+        baseline = {entry["topics"]: entry for entry in json.load(f)["scenarios"]}
+    regressions = []
+    for result in results:
+        expected = baseline.get(result["topics"])
+        if not expected:
+            continue
+        floor = expected["topics_per_minute"] * (1 - tolerance)
+        if result["topics_per_minute"] < floor:
+            regressions.append(
+                f"{result['topics']} topics: {result['topics_per_minute']} topics/min "
+                f"< {floor:.2f} (baseline {expected['topics_per_minute']})"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark for the Threads AI bot pipeline")
+    parser.add_argument("--topics", type=int, action="append", help="topic count per run (repeatable)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--serper-latency", type=float, default=0.05)
+    parser.add_argument("--openai-latency", type=float, default=0.3, help="time to first token")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="delay between stream chunks")
+    parser.add_argument("--threads-latency", type=float, default=0.05)
+    parser.add_argument("--processing-time", type=float, default=0.0, help="container processing time")
+    parser.add_argument("--long-ratio", type=float, default=0.1, help="share of over-length generations")
+    parser.add_argument("--memory", action="store_true", help="track peak Python allocations (slower)")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's own log output")
+    parser.add_argument("--output", help="write results JSON to this file")
+    parser.add_argument("--check", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed throughput drop vs baseline")
+    args = parser.parse_args(argv)
+
+    servers = setup_environment(args)
+    try:
+        results = []
+        for topic_count in args.topics or SCENARIOS:
+            result = run_scenario(topic_count, args.runs, args.memory, args.verbose)
+            results.append(result)
+            print(json.dumps(result, ensure_ascii=False), file=sys.stderr)
+        report = {
+            "scenarios": results,
+            "requests": {name: server.requests for name, server in servers.items()},
+        }
+    finally:
+        for server in servers.values():
+            server.stop()
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+    if args.check:
+        regressions = check_against(results, args.check, args.tolerance)
+        for regression in regressions:
+            print("[-] 성능 회귀:", regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,9 @@
 import os
+import time
 import threading
-import requests
-from flask import Flask, request, redirect, jsonify
-from src import bot
+from flask import Flask, Response, request, redirect, jsonify
+from src import bot, http_client, jobs, metrics
+from src.token_store import get_token_store, start_refresher
 
 app = Flask(__name__)
 
@@ -14,7 +15,17 @@ SCOPE = "threads_basic"
 AUTH_URL = "https://threads.net/oauth/authorize"
 TOKEN_URL = "https://graph.threads.net/oauth/access_token"
 LONG_LIVED_TOKEN_URL = "https://graph.threads.net/access_token"
+PROFILE_URL = "https://graph.threads.net/v1.0/me"
 RESPONSE_TYPE = "code"
+# 서버 시작 직후 백그라운드에서 openai/langchain 임포트와 LLM 클라이언트 생성을 미리 수행
+# (false면 첫 /runbot 작업에서 수행)
+PREWARM_IMPORTS = os.getenv("PREWARM_IMPORTS", "true").lower() in ("1", "true", "yes")
+# 게시물 버퍼를 주기적으로 채우는 간격 (초, 0이면 외부 스케줄러가 /produce를 호출)
+POST_BUFFER_PRODUCE_INTERVAL = float(os.getenv("POST_BUFFER_PRODUCE_INTERVAL", "0"))
+# 버퍼를 채울 시간대 (예: "1-6"이면 1시~5시대에만 생성, 비워 두면 항상)
+POST_BUFFER_PRODUCE_HOURS = os.getenv("POST_BUFFER_PRODUCE_HOURS", "")
+# 버퍼 채우기 작업 등록이 실패했을 때 다시 시도하기까지의 기준 대기 시간 (초, 실패할 때마다 2배)
+PRODUCE_RETRY_BASE = float(os.getenv("PRODUCE_RETRY_BASE", "5"))
 
 @app.route('/')
 def home():
@@ -42,7 +53,7 @@ def callback():
         'grant_type': 'authorization_code'
     }
     
-    response = requests.post(TOKEN_URL, data=token_data)
+    response = http_client.post(TOKEN_URL, data=token_data)
     
     if response.status_code == 200:
         token_info = response.json()
@@ -54,18 +65,28 @@ def callback():
             'client_secret': CLIENT_SECRET,
             'access_token': short_lived_access_token
         }
-        long_token_response = requests.get(LONG_LIVED_TOKEN_URL, params=long_token_data)
+        long_token_response = http_client.get(LONG_LIVED_TOKEN_URL, params=long_token_data)
         
         if long_token_response.status_code == 200:
             long_token_info = long_token_response.json()
             long_lived_access_token = long_token_info.get('access_token')
             expires_in = long_token_info.get('expires_in')
 
-            # 토큰 저장 (실제 환경에서는 안전한 저장 방법 고려)
-            os.environ["ACCESS_TOKEN"] = long_lived_access_token
-            
+            # 토큰 주인의 사용자 ID를 조회해 계정별 토큰 저장소에 저장
+            # (실행 중인 봇도 다음 게시부터 이 토큰을 사용)
+            profile_response = http_client.get(PROFILE_URL, params={
+                'fields': 'id,username',
+                'access_token': long_lived_access_token
+            })
+            if profile_response.status_code != 200:
+                return jsonify({"error": "Failed to fetch user profile", "details": profile_response.json()}), 400
+            profile = profile_response.json()
+            get_token_store().save(profile['id'], long_lived_access_token, expires_in, profile.get('username'))
+
             return jsonify({
                 "message": "Long-lived access token received!",
+                "user_id": profile['id'],
+                "username": profile.get('username'),
                 "long_lived_access_token": long_lived_access_token,
                 "expires_in": expires_in
             })
@@ -74,29 +95,125 @@ def callback():
     else:
         return jsonify({"error": "Failed to get access token", "details": response.json()}), 400
 
-# 중복 실행 방지 위한 전역 변수 및 락 설정
-is_running = False
-lock = threading.Lock()
+def in_produce_hours(hour: int) -> bool:
+    if not POST_BUFFER_PRODUCE_HOURS:
+        return True
+    start, end = (int(value) for value in POST_BUFFER_PRODUCE_HOURS.split("-"))
+    # "22-4"처럼 자정을 넘는 구간도 허용
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+def produce_loop():
+    """
+    POST_BUFFER_PRODUCE_INTERVAL마다 버퍼 채우기 작업을 큐에 등록합니다.
+    같은 주기 안에서는 같은 Idempotency-Key를 쓰므로 워커가 여러 개여도 작업은 하나만 생성됩니다.
+    등록에 실패하면(예: 작업 DB 잠금) 스레드가 죽지 않도록 기록하고, 주기를 넘지 않는 선에서 점점 길게 기다렸다가 다시 시도합니다.
+    """
+    failures = 0
+    while True:
+        now = time.time()
+        try:
+            if in_produce_hours(time.localtime(now).tm_hour):
+                jobs.enqueue("produce", {}, idempotency_key=f"produce-{int(now // POST_BUFFER_PRODUCE_INTERVAL)}")
+        except Exception as e:
+            failures += 1
+            backoff = min(POST_BUFFER_PRODUCE_INTERVAL, PRODUCE_RETRY_BASE * 2 ** (failures - 1))
+            print(f"[-] 버퍼 채우기 작업 등록 실패 ({failures}회), {backoff:.0f}초 뒤 다시 시도:", e)
+            time.sleep(backoff)
+            continue
+        failures = 0
+        time.sleep(POST_BUFFER_PRODUCE_INTERVAL - now % POST_BUFFER_PRODUCE_INTERVAL)
+
+# 작업 큐: /runbot 요청은 큐에 쌓이고 워커 풀이 순서대로 실행
+jobs.register_handler("runbot", bot.run)
+# 게시물 미리 생성 (검색/LLM은 여기서 수행하고 /runbot은 API 호출만 수행)
+jobs.register_handler("produce", bot.produce_run)
+# 게시 한도 간격 때문에 미룬 게시물을 예약 시각에 게시
+jobs.register_handler("publish", bot.publish_scheduled)
+jobs.start_workers()
+# 만료가 가까운 장기 토큰을 백그라운드에서 갱신
+start_refresher()
+if PREWARM_IMPORTS:
+    threading.Thread(target=bot.prewarm, name="prewarm", daemon=True).start()
+if POST_BUFFER_PRODUCE_INTERVAL > 0:
+    threading.Thread(target=produce_loop, name="post-producer", daemon=True).start()
+
+def job_payload() -> dict:
+    """
+    topic/account(여러 번 지정 가능), trace, processes 쿼리 파라미터를 작업 payload로 변환합니다.
+    """
+    payload = {}
+    topics = request.args.getlist("topic")
+    if topics:
+        payload["topics"] = topics
+    accounts = request.args.getlist("account")
+    if accounts:
+        payload["accounts"] = accounts
+    if request.args.get("trace"):
+        payload["trace"] = True
+    # processes=<n>이면 작업을 n개 프로세스로 나눠 실행
+    processes = request.args.get("processes", type=int)
+    if processes:
+        payload["processes"] = processes
+    return payload
+
+def enqueue_job(kind: str, payload: dict):
+    # 같은 Idempotency-Key로 여러 번 호출해도 작업은 하나만 생성됨
+    idempotency_key = request.headers.get("Idempotency-Key") or request.args.get("key")
+    job = jobs.enqueue(kind, payload, idempotency_key=idempotency_key)
 
-def run_and_reset():
-    global is_running
-    try:
-        bot.main()  # 실제 게시물 업로드 작업 수행
-    finally:
-        with lock:
-            is_running = False
+    # wait=<초>가 주어지면 작업이 끝날 때까지 기다렸다가 결과(trace 포함)를 반환
+    wait = request.args.get("wait", default=0, type=float)
+    deadline = time.time() + wait
+    while wait and job["status"] not in (jobs.SUCCEEDED, jobs.FAILED) and time.time() < deadline:
+        time.sleep(0.5)
+        job = jobs.get_job(job["id"])
+    if job["status"] in (jobs.SUCCEEDED, jobs.FAILED):
+        return jsonify(job)
 
-# 외부 스케줄러용 엔드포인트 (중복 실행 방지 추가)
+    return jsonify({
+        "message": "Bot execution queued!",
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['id']}"
+    }), 202
+
+# 외부 스케줄러용 엔드포인트 (작업 큐에 실행 요청을 등록)
+# 기본적으로 미리 생성한 게시물을 게시하며, buffered=0이면 그 자리에서 생성해 게시
 @app.route('/runbot', methods=['GET'])
 def run_bot():
-    global is_running
-    with lock:
-        if is_running:
-            return jsonify({"message": "Bot is already running!"}), 429
-        is_running = True
-    thread = threading.Thread(target=run_and_reset)
-    thread.start()
-    return jsonify({"message": "Bot execution started!"})
+    payload = job_payload()
+    buffered = request.args.get("buffered")
+    if buffered is not None:
+        payload["buffered"] = buffered.lower() in ("1", "true", "yes")
+    return enqueue_job("runbot", payload)
+
+# 한가한 시간에 게시물 버퍼를 채우는 엔드포인트
+@app.route('/produce', methods=['GET'])
+def produce():
+    return enqueue_job("produce", job_payload())
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = jobs.get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    status = request.args.get("status")
+    limit = request.args.get("limit", default=50, type=int)
+    return jsonify({"jobs": jobs.list_jobs(status, limit)})
+
+# 토큰 저장소에 등록된 계정 목록 (토큰 값은 노출하지 않음)
+@app.route('/accounts', methods=['GET'])
+def list_accounts():
+    return jsonify({"accounts": get_token_store().accounts(include_expired=True)})
+
+# Prometheus 스크레이프용 지표 엔드포인트
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
@@ -1,43 +1,109 @@
 import os
-import openai
-import requests
 import json
 import random
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from dotenv import load_dotenv
-from src.prompt import get_prompt  # 기존 프롬프트 템플릿 사용
+from src.prompt import get_messages  # 정적 시스템 블록 + 뉴스 블록 메시지
+from src import http_client, search_cache, metrics, containers, compaction, sharding, jobs
+from src.history import get_history
+from src.validator import fit_post, validate_post, exceeds_budget
+from src.ranking import pick_best
+from src.images import pick_image
+from src.ratelimit import THREADS_QUOTA_WINDOW, limiter, publish_scheduler
+from src.token_store import get_token_store
+from src.post_buffer import get_post_buffer, POST_BUFFER_TARGET
+from src.topics import registry as topic_registry
+from src.llm import LLM_WARMUP, OPENAI_MODEL, get_llm, warm_up, registry as llm_registry
+from src.generation_cache import GENERATION_CACHE, get_generation_cache, cache_stats as generation_cache_stats
 
-# 최신 권장사항에 따라 ChatOpenAI를 langchain_openai에서 임포트
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.chains import LLMChain
-
-# Google Serper Search API 임포트 (기사 검색용)
-from langchain_community.utilities import GoogleSerperAPIWrapper
+# openai/langchain 모듈은 임포트에 1초 가까이 걸리므로 처음 필요할 때 load_dependencies()에서 불러옴
+# (웹 서버의 /, /login 요청과 워커 부팅은 이 비용을 치르지 않음)
 
 
 # .env 파일 로드
 load_dotenv()
 
 # 환경 변수 로드
+# ACCESS_TOKEN/USER_ID는 기본 계정으로 토큰 저장소에 등록되며, 실제 토큰은 게시할 때마다 저장소에서 읽음
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 USER_ID = os.getenv("USER_ID")  # Threads 사용자 ID
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")  # Serper API 키
 
-# OpenAI API 설정
-openai.api_key = OPENAI_API_KEY
-BASE_URL = "https://graph.threads.net/v1.0"
+BASE_URL = os.getenv("THREADS_BASE_URL", "https://graph.threads.net/v1.0")
+SERPER_BASE_URL = os.getenv("SERPER_BASE_URL", "https://google.serper.dev")
+
+# 동시 실행 설정: 주제 단위 병렬 처리 개수와 백엔드별 동시 요청 제한
+TOPIC_WORKERS = int(os.getenv("TOPIC_WORKERS", "4"))
+SERPER_CONCURRENCY = int(os.getenv("SERPER_CONCURRENCY", "4"))
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "4"))
+THREADS_CONCURRENCY = int(os.getenv("THREADS_CONCURRENCY", "2"))
+# 스트리밍 생성: 출력이 게시물 길이 제한을 넘을 것이 확실해지면 즉시 중단
+STREAM_GENERATION = os.getenv("STREAM_GENERATION", "true").lower() in ("1", "true", "yes")
+# 2 이상이면 한 번의 요청으로 후보 N개를 생성하고 로컬 점수로 가장 좋은 게시물을 선택
+CANDIDATE_COUNT = int(os.getenv("CANDIDATE_COUNT", "1"))
+# 호출 한도에 걸렸을 때 같은 요청을 다시 시도하는 횟수
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "2"))
+# 이미 다룬 뉴스는 LLM 호출 없이 건너뜀 (false로 끄면 항상 생성)
+SKIP_DUPLICATE_NEWS = os.getenv("SKIP_DUPLICATE_NEWS", "true").lower() in ("1", "true", "yes")
+# /runbot이 미리 생성해 둔 게시물(post_buffer)을 게시 (false면 매번 그 자리에서 생성)
+POST_BUFFER = os.getenv("POST_BUFFER", "true").lower() in ("1", "true", "yes")
+# 버퍼가 비어 있으면 그 자리에서 생성해 게시
+POST_BUFFER_FALLBACK = os.getenv("POST_BUFFER_FALLBACK", "true").lower() in ("1", "true", "yes")
+# 작업 큐 실행(run/produce_run)에서 오류 결과 비율이 이 값 이상이면 예외를 내 작업을 재시도 대상으로 만듦
+# (1.0이면 모든 작업이 실패했을 때만. 재시도는 실행 전체를 다시 하므로 이미 성공한 작업은 이력/리스로 건너뜀)
+RUN_FAILURE_RATIO = float(os.getenv("RUN_FAILURE_RATIO", "1.0"))
+# 게시 토큰을 이 시간(초)보다 오래 기다려야 하면 레인에서 잠들지 않고 그 시각에 실행되는 예약 게시 작업으로 넘김
+# (작업 워커를 붙잡지 않도록. 0이면 항상 레인에서 기다림)
+PUBLISH_DEFER_SECONDS = float(os.getenv("PUBLISH_DEFER_SECONDS", "60"))
+
+serper_slots = threading.BoundedSemaphore(SERPER_CONCURRENCY)
+openai_slots = threading.BoundedSemaphore(OPENAI_CONCURRENCY)
+threads_slots = threading.BoundedSemaphore(THREADS_CONCURRENCY)
 
-def upload_post(access_token: str, text: str, image_url: str = None):
+# 주제 내부에서 웹 검색과 이미지 검색을 겹쳐 실행하기 위한 풀
+# (주제 풀과 분리해야 중첩 submit으로 인한 교착이 생기지 않음)
+search_pool = ThreadPoolExecutor(max_workers=SERPER_CONCURRENCY, thread_name_prefix="serper")
+
+def threads_request(user_id: str, endpoint: str, stage: str, method: str, url: str, block: bool = True,
+                    reserved: bool = False, **kwargs):
     """
-    Threads API를 사용하여 게시물을 업로드합니다.
-    image_url이 제공되면 단일 게시물로 이미지와 텍스트를 함께 업로드합니다.
+    계정/엔드포인트별 토큰 버킷을 거쳐 Threads API를 호출합니다.
+    호출 한도에 걸리면 버킷이 정한 시간만큼 기다렸다가 RATE_LIMIT_RETRIES번까지 다시 시도합니다.
+    한도 대기 시간이 너무 길면 None을 반환합니다.
+    block이 False면 기다리지 않습니다. 토큰이 없거나 호출 한도에 걸리면 바로 None을 반환하므로,
+    호출한 쪽이 limiter.delay()만큼 뒤에 다시 시도해야 합니다.
+    reserved가 True면 호출한 쪽이 이미 limiter.reserve()로 토큰을 받아 둔 것이므로 첫 시도는 토큰 없이 보냅니다.
     """
-    if not access_token or not text:
-        return {"error": "Missing access token or text for post"}
+    response = None
+    for attempt in range(RATE_LIMIT_RETRIES + 1 if block else 1):
+        if block and not (reserved and attempt == 0) and not limiter.acquire(user_id, endpoint):
+            return None
+        if not block and limiter.try_acquire(user_id, endpoint) > 0:
+            return None
+        with threads_slots, metrics.span(stage) as span:
+            response = http_client.request(method, url, **kwargs)
+            span.set(bytes=len(response.content), status=response.status_code)
+        if not limiter.observe(user_id, endpoint, response):
+            break
+        if not block:
+            return None
+    return response
+
+def threads_post(user_id: str, endpoint: str, url: str, payload: dict, reserved: bool = False):
+    stage = "container_create" if endpoint == "threads" else "publish"
+    return threads_request(user_id, endpoint, stage, "POST", url, reserved=reserved, data=payload)
+
+def create_container(access_token: str, text: str, image_url: str = None, user_id: str = None) -> dict:
+    """
+    게시물 미디어 컨테이너를 생성하고 {"container_id": ...} 또는 {"error": ...}를 반환합니다.
+    image_url이 제공되면 이미지와 텍스트를 함께 담은 IMAGE 컨테이너를 만듭니다.
+    """
+    user_id = user_id or USER_ID
+    media_url = f"{BASE_URL}/{user_id}/threads"
 
-    media_url = f"{BASE_URL}/{USER_ID}/threads"
-    
     if image_url:
         payload = {
             'media_type': 'IMAGE',
@@ -51,18 +117,59 @@ def upload_post(access_token: str, text: str, image_url: str = None):
             'text': text,
             'access_token': access_token
         }
-    
-    response = requests.post(media_url, data=payload)
+
+    response = threads_post(user_id, "threads", media_url, payload)
+    if response is None:
+        return {"error": "Rate limited", "details": limiter.snapshot()}
     container_id = response.json().get('id')
     if not container_id:
         return {"error": "Failed to create media container", "details": response.json()}
+    return {"container_id": container_id}
+
+def check_container(access_token: str, container_id: str, user_id: str = None, block: bool = True) -> dict:
+    """
+    컨테이너의 처리 상태(status, error_message)를 조회합니다.
+    block이 False면 호출 한도 토큰을 기다리지 않고, 한도에 걸렸을 때 다시 조회할 시각까지의 시간(retry_after)을 함께 반환합니다.
+    """
+    user_id = user_id or USER_ID
+    response = threads_request(user_id, "threads", "container_status", "GET",
+                               f"{BASE_URL}/{container_id}", block=block,
+                               params={'fields': 'status,error_message', 'access_token': access_token})
+    if response is None:
+        return {"status": None, "error_message": "Rate limited", "retry_after": limiter.delay(user_id, "threads")}
+    return response.json()
+
+def wait_for_container(access_token: str, container_id: str, user_id: str = None, image: bool = True) -> Future:
+    """
+    컨테이너가 게시 가능한 상태가 되면 완료되는 Future를 반환합니다.
+    IMAGE 컨테이너는 원격 이미지를 가져오는 동안 IN_PROGRESS 상태이므로 백오프하며 상태를 확인하고,
+    (조회는 호출 한도 토큰을 기다리지 않으며, 한도에 걸리면 폴러가 retry_after 뒤로 다시 예약)
+    TEXT 컨테이너는 바로 게시할 수 있어 조회 없이 완료된 Future를 반환합니다.
+    """
+    if not image:
+        ready = Future()
+        ready.set_result({"status": containers.FINISHED, "checks": 0, "waited": 0.0})
+        return ready
+    return containers.container_poller.watch(
+        metrics.bind(lambda: check_container(access_token, container_id, user_id, block=False)))
 
-    publish_url = f"{BASE_URL}/{USER_ID}/threads_publish"
+def publish_container(access_token: str, container_id: str, user_id: str = None, reserved_at: float = None) -> dict:
+    """
+    컨테이너를 게시합니다.
+    reserved_at이 주어지면 그 시각에 쓰도록 이미 게시 토큰을 예약한 것이므로, 그때까지 기다린 뒤 토큰 없이 게시합니다.
+    """
+    user_id = user_id or USER_ID
+    publish_url = f"{BASE_URL}/{user_id}/threads_publish"
     payload = {
         'creation_id': container_id,
         'access_token': access_token
     }
-    publish_response = requests.post(publish_url, data=payload)
+    if reserved_at is not None and reserved_at > time.time():
+        time.sleep(reserved_at - time.time())
+    publish_response = threads_post(user_id, "threads_publish", publish_url, payload,
+                                    reserved=reserved_at is not None)
+    if publish_response is None:
+        return {"error": "Rate limited", "container_id": container_id, "details": limiter.snapshot()}
     if publish_response.status_code == 200:
         return {
             "message": "[+] 게시물 업로드 완료",
@@ -71,9 +178,78 @@ def upload_post(access_token: str, text: str, image_url: str = None):
     else:
         return {
             "error": "Failed to publish post",
+            "container_id": container_id,
             "details": publish_response.json()
         }
 
+def submit_post(access_token: str, text: str, image_url: str = None, user_id: str = None,
+                reserved_at: float = None) -> Future:
+    """
+    컨테이너 생성 → 상태 확인 → 게시를 파이프라인으로 실행하고, 게시 결과로 완료되는 Future를 반환합니다.
+    컨테이너 생성만 호출한 스레드에서 하고, 이후 단계는 상태 확인 스레드와 계정별 게시 대기열에서 이어지므로
+    호출한 스레드는 곧바로 다음 주제를 처리할 수 있습니다.
+    reserved_at은 publish_container()에 그대로 넘깁니다.
+    """
+    user_id = user_id or USER_ID
+    result = Future()
+    if not access_token or not text:
+        result.set_result({"error": "Missing access token or text for post"})
+        return result
+    created = create_container(access_token, text, image_url=image_url, user_id=user_id)
+    if "error" in created:
+        result.set_result(created)
+        return result
+    container_id = created["container_id"]
+
+    def on_published(future):
+        try:
+            result.set_result(future.result())
+        except Exception as e:
+            result.set_exception(e)
+
+    def on_ready(future):
+        try:
+            status = future.result()
+            metrics.observe("bot_container_wait_seconds", status.get("waited") or 0.0)
+            if status.get("status") != containers.FINISHED:
+                result.set_result({"error": "Media container not ready", "container_id": container_id,
+                                   "details": status})
+                return
+            # 계정별 게시 대기열을 거쳐 한도 구간에 맞춰 게시
+            publish_scheduler.submit(user_id, metrics.bind(publish_container), access_token, container_id,
+                                     user_id=user_id, reserved_at=reserved_at).add_done_callback(on_published)
+        except Exception as e:
+            result.set_exception(e)
+
+    wait_for_container(access_token, container_id, user_id, image=bool(image_url)).add_done_callback(
+        metrics.bind(on_ready))
+    return result
+
+def upload_post(access_token: str, text: str, image_url: str = None, user_id: str = None):
+    """
+    Threads API를 사용하여 게시물을 업로드하고 게시가 끝날 때까지 기다립니다.
+    image_url이 제공되면 단일 게시물로 이미지와 텍스트를 함께 업로드합니다.
+    user_id를 생략하면 기본 계정(USER_ID)으로 게시합니다.
+    """
+    return submit_post(access_token, text, image_url=image_url, user_id=user_id).result()
+
+def sync_publishing_quota(access_token: str, user_id: str = None):
+    """
+    threads_publishing_limit 엔드포인트에서 실제 게시 한도와 사용량을 받아 게시 버킷에 반영합니다.
+    실패해도 기본 한도로 계속 동작합니다.
+    """
+    user_id = user_id or USER_ID
+    try:
+        response = http_client.get(f"{BASE_URL}/{user_id}/threads_publishing_limit",
+                                   params={"fields": "quota_usage,config", "access_token": access_token})
+        data = (response.json().get("data") or [{}])[0]
+        config = data.get("config") or {}
+        if config.get("quota_total") and config.get("quota_duration"):
+            limiter.set_quota(user_id, "threads_publish", config["quota_total"], config["quota_duration"],
+                              data.get("quota_usage") or 0)
+    except Exception as e:
+        print(f"[-] 게시 한도 조회 실패 ({user_id}):", e)
+
 # 뉴스 검색 기반반
 # def search_news(topic: str) -> tuple:
 #     """
@@ -112,100 +288,697 @@ def upload_post(access_token: str, text: str, image_url: str = None):
 #         return None
 
 
-def search_web(topic: str) -> str:
+_dependencies = None
+_dependencies_lock = threading.Lock()
+
+def load_dependencies() -> dict:
+    """
+    무거운 openai/langchain 모듈을 처음 호출될 때 한 번만 임포트합니다.
+    app에서는 서버 시작 직후 백그라운드 스레드로 미리 호출해 첫 /runbot 지연도 줄입니다.
+    """
+    global _dependencies
+    if _dependencies is None:
+        with _dependencies_lock:
+            if _dependencies is None:
+                import openai
+                # ChatOpenAI 클래스를 미리 로드 (인스턴스는 src.llm 레지스트리에서 재사용)
+                import langchain_openai  # noqa: F401
+                from langchain_core.messages import convert_to_messages
+                # Google Serper Search API 임포트 (기사 검색용)
+                from langchain_community.utilities import GoogleSerperAPIWrapper
+
+                # OpenAI API 설정
+                openai.api_key = OPENAI_API_KEY
+
+                class PooledSerperAPIWrapper(GoogleSerperAPIWrapper):
+                    """
+                    GoogleSerperAPIWrapper의 HTTP 호출을 공유 세션(http_client)으로 보내도록 바꾼 래퍼입니다.
+                    """
+
+                    def _google_serper_api_results(self, search_term: str, search_type: str = "search",
+                                                   **kwargs) -> dict:
+                        headers = {
+                            "X-API-KEY": self.serper_api_key or "",
+                            "Content-Type": "application/json",
+                        }
+                        params = {
+                            "q": search_term,
+                            **{key: value for key, value in kwargs.items() if value is not None},
+                        }
+                        response = http_client.post(f"{SERPER_BASE_URL}/{search_type}", headers=headers,
+                                                    params=params)
+                        response.raise_for_status()
+                        return response.json()
+
+                _dependencies = {
+                    "convert_to_messages": convert_to_messages,
+                    "PooledSerperAPIWrapper": PooledSerperAPIWrapper,
+                }
+    return _dependencies
+
+
+def prewarm():
+    """
+    워커 시작 시 백그라운드에서 호출합니다. 무거운 모듈을 임포트하고 LLM_WARMUP이 켜져 있으면
+    기본 LLM 클라이언트를 미리 만들어 첫 생성 요청의 지연을 없앱니다.
+    """
+    load_dependencies()
+    if LLM_WARMUP:
+        warm_up()
+
+
+_serper = None
+_serper_lock = threading.Lock()
+
+def get_serper():
+    """
+    Serper 래퍼는 설정이 고정되어 있으므로 한 번만 생성해 재사용합니다.
+    """
+    global _serper
+    if _serper is None:
+        with _serper_lock:
+            if _serper is None:
+                wrapper_class = load_dependencies()["PooledSerperAPIWrapper"]
+                _serper = wrapper_class(tbs="qdr:h",
+                                        type="search",
+                                        serper_api_key=SERPER_API_KEY,
+                                        k=20)
+    return _serper
+
+def search_web(topic: str, stats: dict = None) -> str:
     """
     Google Serper Search API를 사용하여 주제에 관한 최신 텍스트 정보를 검색합니다.
-    기존 함수를 그대로 사용합니다.
+    같은 검색 기간(tbs) 안에서 반복되는 검색은 캐시된 결과를 사용합니다.
+    NEWS_COMPACTION이 켜져 있으면 중복/상투 문구를 걷어내고 최신성/관련도 순으로
+    토큰 예산(NEWS_TOKEN_BUDGET) 안에 들어가는 항목만 남깁니다.
+    stats 딕셔너리를 넘기면 압축 전후 토큰 수를 채워줍니다.
     """
-    serper = GoogleSerperAPIWrapper(tbs="qdr:h", 
-                                type="search", 
-                                serper_api_key=SERPER_API_KEY,
-                                k=20)
-    result = serper.run(topic+" news")
-    return result
+    serper = get_serper()
+    query = topic+" news"
+    fetched = []
+
+    def fetch():
+        fetched.append(True)
+        with serper_slots:
+            return serper.results(query)
+
+    with metrics.span("search_web") as span:
+        results = search_cache.cached_search(query, serper.type, serper.tbs, serper.k, fetch)
+        news = serper._parse_results(results)
+        span.set(bytes=len(news.encode("utf-8")), cached=not fetched)
+    if compaction.NEWS_COMPACTION:
+        with metrics.span("news_compaction") as span:
+            news, info = compaction.compact(results, topic, raw_text=news)
+            span.set(bytes=len(news.encode("utf-8")), **info)
+        metrics.inc("bot_news_tokens_saved_total", info["saved"] or 0)
+        if stats is not None:
+            stats.update(info)
+    return news
 
 def search_image(query: str) -> str:
     """
     Serper 이미지 검색 API를 사용하여 주제와 관련된 이미지 중
     무작위로 하나의 imageUrl을 반환합니다.
+    이미지 목록은 캐시하고, 무작위 선택은 매번 새로 합니다.
+    선택한 이미지는 형식/파일 크기/해상도를 미리 검사하여 Threads 규격을 통과하는 URL만 반환합니다.
     """
-    url = "https://google.serper.dev/images"
-    payload = json.dumps({
-         "q": query,
-         "tbs": "qdr:h",
-         "num": 10
-    })
-    headers = {
-         "X-API-KEY": SERPER_API_KEY,
-         "Content-Type": "application/json"
-    }
-    response = requests.request("POST", url, headers=headers, data=payload)
-    if response.status_code == 200:
+    url = f"{SERPER_BASE_URL}/images"
+    tbs = "qdr:h"
+    num = 10
+
+    fetched = []
+
+    def fetch():
+        fetched.append(True)
+        payload = json.dumps({
+             "q": query,
+             "tbs": tbs,
+             "num": num
+        })
+        headers = {
+             "X-API-KEY": SERPER_API_KEY,
+             "Content-Type": "application/json"
+        }
+        with serper_slots:
+            response = http_client.post(url, headers=headers, data=payload)
+        if response.status_code != 200:
+            print("Serper 이미지 검색 실패:", response.text)
+            return None
         try:
-            data = response.json()
-            images = data.get("images", [])
-            if images:
-                chosen = random.choice(images)  # 무작위 선택
-                return chosen.get("imageUrl")
+            return response.json().get("images", [])
         except Exception as e:
             print("이미지 검색 결과 처리 중 오류:", e)
             return None
+
+    with metrics.span("search_image") as span:
+        images = search_cache.cached_search(query, "images", tbs, num, fetch)
+        span.set(results=len(images or []), cached=not fetched)
+    if not images:
+        return None
+    # 무작위 순서로 후보를 검사하여 규격을 통과한 이미지 하나를 선택
+    candidates = random.sample(images, len(images))
+    with metrics.span("image_check", candidates=len(candidates)) as span:
+        image_url = pick_image(candidates)
+        span.set(found=image_url is not None)
+    return image_url
+
+
+
+def stream_thread_post(llm, messages) -> tuple:
+    """
+    토큰을 받는 즉시 누적하면서 글자 수 예산을 확인하고,
+    게시물 한 개에 들어갈 수 없다고 판단되면 스트림을 끊습니다.
+    (생성 결과, 통계) 튜플을 반환하며 통계에는 첫 토큰까지의 시간(ttft)과 전체 생성 시간이 포함됩니다.
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    parts = []
+    aborted = False
+    usage = None
+    stream = llm.stream(messages)
+    try:
+        for chunk in stream:
+            # 마지막 청크에 토큰 사용량이 담겨 옴 (stream_usage=True)
+            if getattr(chunk, "usage_metadata", None):
+                usage = chunk.usage_metadata
+            if not chunk.content:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(chunk.content)
+            if exceeds_budget("".join(parts)):
+                aborted = True
+                break
+    finally:
+        # 중단 시 제너레이터를 닫아 HTTP 스트림도 함께 종료
+        stream.close()
+    text = "".join(parts).strip()
+    stats = {
+        "ttft": round(first_token_at - started, 3) if first_token_at else None,
+        "latency": round(time.perf_counter() - started, 3),
+        "aborted": aborted,
+        "chars": len(text),
+        "input_tokens": usage.get("input_tokens") if usage else None,
+        "output_tokens": usage.get("output_tokens") if usage else None,
+    }
+    return text, stats
+
+def generate_thread_post_chain(final_prompt, stream: bool = None, stats: dict = None) -> str:
+    """
+    프롬프트를 기반으로 게시물 콘텐츠를 생성합니다.
+    final_prompt는 (role, content) 메시지 목록 또는 단일 문자열입니다.
+    ChatPromptTemplate로 다시 파싱하지 않으므로 뉴스에 포함된 {, }도 그대로 전달됩니다.
+    stream이 켜져 있으면 길이 초과가 확실해지는 시점에 생성을 중단하며, 이 경우
+    잘린 출력이 반환되므로 fit_post에서 걸러져 재생성으로 이어집니다.
+    stats 딕셔너리를 넘기면 ttft/latency/aborted 값을 채워줍니다.
+    LLM 클라이언트는 호출마다 만들지 않고 src.llm 레지스트리의 인스턴스(공유 연결 풀)를 재사용합니다.
+    """
+    if stream is None:
+        stream = STREAM_GENERATION
+    messages = [("human", final_prompt)] if isinstance(final_prompt, str) else final_prompt
+    llm = get_llm(stream_usage=True)
+    with openai_slots, metrics.span("llm_generate", stream=stream) as span:
+        if stream:
+            content, info = stream_thread_post(llm, messages)
+        else:
+            started = time.perf_counter()
+            result = llm.invoke(messages)
+            content = result.content.strip()
+            usage = result.usage_metadata or {}
+            info = {"ttft": None, "latency": round(time.perf_counter() - started, 3), "aborted": False,
+                    "chars": len(content), "input_tokens": usage.get("input_tokens"),
+                    "output_tokens": usage.get("output_tokens")}
+        span.set(**{key: value for key, value in info.items() if key != "latency"})
+    if stats is not None:
+        stats.update(info)
+    return content
+
+def generate_thread_post_candidates(final_prompt, n: int = None, stats: dict = None) -> list:
+    """
+    한 번의 API 호출(n 파라미터)로 게시물 후보 n개를 생성합니다.
+    """
+    n = n or CANDIDATE_COUNT
+    messages = [("human", final_prompt)] if isinstance(final_prompt, str) else final_prompt
+    dependencies = load_dependencies()
+    llm = get_llm(n=n)
+    started = time.perf_counter()
+    with openai_slots, metrics.span("llm_generate", candidates=n) as span:
+        result = llm.generate([dependencies["convert_to_messages"](messages)])
+        usage = (result.llm_output or {}).get("token_usage") or {}
+        span.set(input_tokens=usage.get("prompt_tokens"), output_tokens=usage.get("completion_tokens"))
+    candidates = [generation.text.strip() for generation in result.generations[0]]
+    if stats is not None:
+        stats.update({"ttft": None, "latency": round(time.perf_counter() - started, 3),
+                      "aborted": False, "candidates": len(candidates)})
+    return candidates
+
+def cached_generation(topic: str, news: str, history, account: str = None) -> dict:
+    """
+    생성 캐시에서 지금 게시할 수 있는 출력(길이 규칙 통과, 최근 게시물과 중복 아님)을 account에 배정합니다.
+    다른 계정에 배정된 변형은 게시 이력에 기록되기 전이어도 건너뜁니다. 없으면 None을 반환합니다.
+    """
+    if not GENERATION_CACHE:
+        return None
+
+    def accept(text):
+        fitted = fit_post(text)
+        return fitted if fitted and not history.find_post(fitted) else None
+
+    with metrics.span("generation_cache") as span:
+        variant, result = get_generation_cache().claim(topic, news, OPENAI_MODEL, account, accept)
+        span.set(result=result, **({"similarity": variant["similarity"]} if variant else {}))
+        metrics.inc("bot_generation_cache_total", result=result)
+    return variant
+
+def generate_post(topic: str, user_id: str = None, skip_news=None) -> dict:
+    """
+    하나의 주제에 대해 검색 → 프롬프트 생성 → 게시물 생성 → 로컬 검증까지 수행합니다. (업로드는 하지 않음)
+    게시할 수 있으면 text/news/image_url이 담긴 딕셔너리를, 아니면 skipped/error가 담긴 딕셔너리를 반환합니다.
+    skip_news(news)가 이유 문자열을 반환하면 LLM을 호출하지 않고 건너뜁니다.
+    """
+    user_id = user_id or USER_ID
+    # 이미지 검색: Serper 이미지 검색을 백그라운드로 먼저 시작
+    image_future = search_pool.submit(metrics.bind(search_image), "Ai")
+    # 기사 검색: Serper를 사용하여 텍스트 기사 검색 (원본 기사 내용)
+    news_stats = {}
+    news = search_web(topic, stats=news_stats)
+    image_url = image_future.result()
+    print(f"[{topic}] 검색된 기사 내용")
+    print(news)
+    print(f"[{topic}] 선택된 이미지 URL:")
+    print(image_url)
+    # 모든 결과에 공통으로 들어가는 항목 (뉴스 압축으로 줄인 입력 토큰 수 포함)
+    base = {"topic": topic, "account": user_id, "news_tokens_saved": news_stats.get("saved") or 0}
+
+    # 최근에 다룬 뉴스와 거의 같으면 LLM 호출 없이 건너뜀
+    history = get_history()
+    # 같은 뉴스라도 다른 계정은 다룰 수 있으므로 계정별로 비교
+    duplicate = history.find_news(news, user_id) if SKIP_DUPLICATE_NEWS else None
+    if duplicate:
+        print(f"[{topic}] 이미 다룬 뉴스입니다. (이력 #{duplicate[0]}, 거리 {duplicate[1]}) 건너뜁니다.")
+        return {**base, "skipped": "duplicate_news", "history_id": duplicate[0]}
+    reason = skip_news(news) if skip_news else None
+    if reason:
+        print(f"[{topic}] 뉴스를 건너뜁니다: {reason}")
+        return {**base, "skipped": reason}
+
+    # 정적 시스템 블록(주제별 캐싱) + 가변 뉴스 블록으로 메시지 구성
+    with metrics.span("prompt_build") as span:
+        final_prompt = get_messages(topic, news)
+        span.set(bytes=sum(len(content.encode("utf-8")) for _, content in final_prompt))
+
+    # 같은(또는 거의 같은) 뉴스로 최근에 생성한 출력이 있으면 LLM을 호출하지 않고 재사용
+    generation = {}
+    candidates = []
+    cached = cached_generation(topic, news, history, user_id)
+    if cached:
+        post_content = cached["text"]
+        generation.update(cached=True, similarity=cached["similarity"])
+    # LangChain 체인을 통해 게시물 내용 생성
+    elif CANDIDATE_COUNT > 1:
+        # 후보 여러 개를 한 번에 생성하고 길이/해시태그/이모티콘/중복 기준으로 선택
+        candidates = generate_thread_post_candidates(final_prompt, CANDIDATE_COUNT, stats=generation)
+        post_content, scores = pick_best(candidates, history.recent_texts())
+        post_content = post_content or candidates[0]
+        generation["scores"] = [round(score, 3) for score in scores]
     else:
-        print("Serper 이미지 검색 실패:", response.text)
-    return None
+        post_content = generate_thread_post_chain(final_prompt, stats=generation)
+    print(f"[{topic}] 게시물 내용:")
+    print(post_content)
+    print(f"[{topic}] 생성 통계:", generation)
 
+    # 업로드 전에 로컬에서 글자 수/해시태그 규칙을 검사하고,
+    # 제한을 조금 넘는 경우엔 LLM 재호출 없이 결정적으로 줄임
+    fitted = fit_post(post_content)
+    # 제한을 크게 넘는 경우에만 재생성 (최대 3회), 업로드 요청은 하지 않음
+    max_retry = 3
+    retry_count = 0
+    while fitted is None and retry_count < max_retry:
+        retry_count += 1
+        metrics.inc("bot_retries_total", reason="too_long")
+        print(f"[{topic}][{retry_count}] 게시물 내용이 {validate_post(post_content)['length']}자로 너무 길어 재생성 시도합니다.")
+        with metrics.span("retry", attempt=retry_count):
+            short_prompt = final_prompt + [("human", "(주의: 게시물 내용은 500자 이하로 요약해서 작성해줘.)")]
+            post_content = generate_thread_post_chain(short_prompt, stats=generation)
+            fitted = fit_post(post_content)
+    if fitted is None:
+        return {**base, "error": "Post exceeds length limit after retries"}
+    if fitted != post_content:
+        print(f"[{topic}] 게시물 내용을 로컬에서 보정했습니다:")
+        print(fitted)
+    if GENERATION_CACHE and not cached:
+        # 선택되지 않은 후보도 변형으로 저장해 다른 계정/다음 실행에서 쓸 수 있게 함
+        variants = [fitted] + [text for text in map(fit_post, candidates) if text and text != fitted]
+        get_generation_cache().store(topic, news, OPENAI_MODEL, variants, account=user_id)
+    duplicate = get_history().find_post(fitted)
+    if duplicate:
+        print(f"[{topic}] 최근 게시물과 거의 같은 내용입니다. (이력 #{duplicate[0]}) 업로드하지 않습니다.")
+        return {**base, "skipped": "duplicate_post", "history_id": duplicate[0]}
+    return {**base, "text": fitted, "news": news, "image_url": image_url}
 
+def schedule_publish(post: dict, user_id: str, run_at: float, buffer_id: int = None) -> dict:
+    """
+    게시물을 run_at에 실행되는 "publish" 작업으로 작업 큐에 넣습니다. (게시 토큰은 호출한 쪽이 이미 예약함)
+    예약은 작업 DB에 남으므로 프로세스가 재시작되어도 유지됩니다.
+    """
+    payload = {key: post.get(key) for key in ("topic", "text", "news", "image_url", "news_tokens_saved")}
+    job = jobs.enqueue("publish", {"post": payload, "user_id": user_id, "buffer_id": buffer_id}, run_at=run_at)
+    print(f"[{post['topic']}][{user_id}] 게시 한도 간격 때문에 {time.strftime('%H:%M:%S', time.localtime(run_at))}에 "
+          f"게시하도록 예약했습니다. (작업 {job['id']})")
+    return {"scheduled_at": run_at, "job_id": job["id"]}
 
-def generate_thread_post_chain(final_prompt: str) -> str:
+def publish_generated(post: dict, user_id: str = None, wait: bool = True, reserved_at: float = None,
+                      buffer_id: int = None):
     """
-    RunnableSequence 스타일 체인을 사용하여 기존 프롬프트(final_prompt)를 기반으로 게시물 콘텐츠를 생성합니다.
+    generate_post()로 만든(또는 버퍼에서 꺼낸) 게시물을 업로드하고 이력에 기록합니다.
+    wait=False면 컨테이너를 만든 뒤 바로 게시 결과 Future를 반환합니다. (상태 확인/게시는 백그라운드에서 진행)
+    게시 토큰을 PUBLISH_DEFER_SECONDS보다 오래 기다려야 하면 업로드하지 않고 예약 게시 작업을 만든 뒤
+    scheduled_at을 담은 결과를 반환합니다. (buffer_id는 그 작업이 게시 후 버퍼 상태를 고칠 때 씀)
+    reserved_at은 이미 예약해 둔 게시 토큰의 시각입니다. (예약 게시 작업이 넘김)
     """
-    prompt_template = ChatPromptTemplate.from_template(final_prompt)
-    llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=0.8)
-    # 체인 구성: 프롬프트 템플릿과 LLM을 연결합니다.
-    chain = prompt_template | llm
-    result = chain.invoke({"prompt": final_prompt})
-    return result.content.strip()
+    user_id = user_id or post.get("account") or USER_ID
+    topic, text, news = post["topic"], post["text"], post.get("news")
+    base = {"topic": topic, "account": user_id, "news_tokens_saved": post.get("news_tokens_saved") or 0}
 
-def main():
-    topics = ["AI Trend"]  # 영어 주제로 설정하여 글로벌 뉴스를 수집
-    for topic in topics:
-        # 기사 검색: Serper를 사용하여 텍스트 기사 검색 (원본 기사 내용)
-        news = search_web(topic)
-        print("검색된 기사 내용")
-        print(news)
-        # 이미지 검색: Serper 이미지 검색으로 첫 번째 이미지 URL 선택
-        image_url = search_image("Ai")
-        print("선택된 이미지 URL:")
-        print(image_url)
-        
-        # 기존 prompt.py의 get_prompt를 사용하여 최종 프롬프트 생성 (요약된 뉴스 포함)
-        final_prompt = get_prompt(topic, news)
+    # 토큰 저장소에서 최신 토큰을 읽으므로 /callback이나 백그라운드 갱신 결과가 바로 반영됨
+    access_token = get_token_store().get(user_id) if user_id else None
+    if not access_token:
+        print(f"[-] [{user_id}] 액세스 토큰 만료 혹은 오류")
+        return {**base, "error": "Missing access token"}
+    # 생성 이후 다른 게시물이 먼저 올라갔을 수 있으므로 게시 직전에 다시 확인
+    history = get_history()
+    duplicate = history.find_post(text)
+    if duplicate:
+        print(f"[{topic}] 최근 게시물과 거의 같은 내용입니다. (이력 #{duplicate[0]}) 업로드하지 않습니다.")
+        return {**base, "skipped": "duplicate_post", "history_id": duplicate[0]}
+    if reserved_at is None and PUBLISH_DEFER_SECONDS > 0:
+        # 먼저 게시 토큰을 예약해 동시에 게시하는 주제끼리도 같은 자리를 받지 않게 하고,
+        # 자리가 멀면 레인에서 잠들지 않고 그 시각의 작업으로 넘김
+        publish_wait = limiter.reserve(user_id, "threads_publish", THREADS_QUOTA_WINDOW)
+        if publish_wait is None:
+            return {**base, "error": "Rate limited", "details": limiter.snapshot()}
+        reserved_at = time.time() + publish_wait
+        if publish_wait > PUBLISH_DEFER_SECONDS:
+            return {**base, **schedule_publish(post, user_id, reserved_at, buffer_id)}
 
-        # LangChain 체인을 통해 게시물 내용 생성
-        post_content = generate_thread_post_chain(final_prompt)
-        print("게시물 내용:")
-        print(post_content)
-    
-        if ACCESS_TOKEN:
-            upload_result = upload_post(ACCESS_TOKEN, post_content, image_url=image_url)
-            # 게시물 내용이 500자를 초과할 경우 재생성 (최대 3회)
-            max_retry = 3
-            retry_count = 0
-            while (
-                "error" in upload_result and
-                "Param text must be at most 500 characters long." in upload_result.get("details", {}).get("error", {}).get("message", "")
-                and retry_count < max_retry
-            ):
-                retry_count += 1
-                print(f"[{retry_count}] 게시물 내용이 500자를 초과하여 재생성 시도합니다.")
-                short_prompt = f"{final_prompt}\n\n(주의: 게시물 내용은 500자 이하로 요약해서 작성해줘.)"
-                post_content = generate_thread_post_chain(short_prompt)
-                upload_result = upload_post(ACCESS_TOKEN, post_content, image_url=image_url)
-            
-            print(upload_result.get('message'))
+    # 컨테이너 생성 후 상태 확인/게시는 파이프라인으로 진행
+    result = Future()
+
+    def on_uploaded(future):
+        try:
+            upload_result = future.result()
+            if "error" not in upload_result:
+                history.record(topic, news, text, account=user_id, container_id=upload_result.get("container_id"))
+            print(f"[{topic}][{user_id}]", upload_result.get('message') or upload_result.get('error'))
+            result.set_result({**base, **upload_result})
+        except Exception as e:
+            result.set_exception(e)
+
+    submit_post(access_token, text, image_url=post.get("image_url"), user_id=user_id,
+                reserved_at=reserved_at).add_done_callback(on_uploaded)
+    return result.result() if wait else result
+
+def publish_scheduled(post: dict, user_id: str, buffer_id: int = None) -> dict:
+    """
+    작업 큐의 "publish" 작업 진입점입니다. schedule_publish()가 예약한 게시물을 예약해 둔 토큰으로 게시합니다.
+    실패하면 예외를 내 작업이 백오프 후 다시 시도되게 합니다. (실패한 게시는 한도에 포함되지 않으므로 같은 예약을 다시 씀)
+    """
+    result = publish_generated(post, user_id, reserved_at=time.time())
+    if buffer_id is not None:
+        buffer = get_post_buffer()
+        if result.get("skipped"):
+            buffer.discard(buffer_id, result["skipped"])
+        elif "error" not in result:
+            buffer.mark_published(buffer_id, result.get("container_id"))
+    check_failures([result])
+    return result
+
+def process_topic(topic: str, user_id: str = None, wait: bool = True):
+    """
+    하나의 주제에 대해 검색 → 프롬프트 생성 → 게시물 생성 → 업로드를 수행합니다.
+    웹 검색과 이미지 검색은 서로 독립적이므로 동시에 실행합니다.
+    user_id 계정으로 게시하며, 생략하면 기본 계정(USER_ID)을 사용합니다.
+    wait=False면 컨테이너를 만든 뒤 바로 게시 결과 Future를 반환합니다. (상태 확인/게시는 백그라운드에서 진행)
+    """
+    user_id = user_id or USER_ID
+    post = generate_post(topic, user_id)
+    if "text" not in post:
+        return post
+    return publish_generated(post, user_id, wait)
+
+def plan_tasks(topics: list = None, accounts: list = None, shard: bool = True) -> list:
+    """
+    (계정, 주제) 작업 목록을 만듭니다. topics를 생략하면 주제 레지스트리(topics.json)를 사용하고,
+    accounts를 생략하면 주제별 계정 설정, 없으면 토큰 저장소에 등록된 모든 계정을 사용합니다.
+    shard가 켜져 있으면 SHARD_INDEX/SHARD_COUNT에 따라 이 노드에 배정된 작업만 남깁니다.
+    """
+    default_accounts = [account["user_id"] for account in get_token_store().accounts()] or [USER_ID]
+    tasks = topic_registry.tasks(topics, accounts, default_accounts)
+    return sharding.shard_tasks(tasks) if shard else tasks
+
+def sync_quotas(tasks: list):
+    store = get_token_store()
+    for user_id in dict.fromkeys(user_id for user_id, _ in tasks):
+        access_token = store.get(user_id) if user_id else None
+        if access_token:
+            sync_publishing_quota(access_token, user_id)
+
+def run_tasks(tasks: list, fn, workers: int = None, kind: str = "publish") -> list:
+    """
+    (계정, 주제) 작업마다 fn(topic, user_id)를 스레드 풀에서 실행합니다.
+    한 작업의 실패가 다른 작업을 막지 않도록 예외는 오류 결과로 바꿉니다.
+    TOPIC_LOCKS가 켜져 있으면 작업 리스를 잡은 뒤 실행하므로, 다른 프로세스/노드가 같은 작업을
+    실행 중이면 건너뜁니다. fn이 Future를 반환하면 게시가 끝날 때 리스를 풉니다.
+    kind가 None이면 (호출한 쪽이 이미 리스를 잡은 경우) 리스 없이 실행합니다.
+    """
+    workers = max(1, min(workers or TOPIC_WORKERS, len(tasks) or 1))
+    locks = sharding.TOPIC_LOCKS and kind is not None
+
+    def run_task(task):
+        user_id, topic = task
+        owner = sharding.lease_owner()
+        if locks and not sharding.acquire_task(kind, task, owner):
+            print(f"[{topic}][{user_id}] 다른 워커가 처리 중이라 건너뜁니다.")
+            return {"topic": topic, "account": user_id, "skipped": "locked"}
+        result = None
+        try:
+            with metrics.use_topic(topic):
+                result = fn(topic, user_id)
+                return result
+        except Exception as e:
+            # 한 주제의 실패가 다른 주제의 실행을 막지 않도록 격리
+            print(f"[-] [{topic}][{user_id}] 처리 중 오류:", e)
+            return {"topic": topic, "account": user_id, "error": str(e)}
+        finally:
+            if locks:
+                if isinstance(result, Future):
+                    result.add_done_callback(lambda _: sharding.release_task(kind, task, owner))
+                else:
+                    sharding.release_task(kind, task, owner)
+
+    if workers == 1:
+        return [run_task(task) for task in tasks]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="topic") as pool:
+        return list(pool.map(metrics.bind(run_task), tasks))
+
+def collect_results(tasks: list, pending: list) -> list:
+    """
+    run_tasks 결과 중 게시 Future를 기다려 결과 딕셔너리 목록으로 바꿉니다.
+    """
+    results = []
+    for (user_id, topic), item in zip(tasks, pending):
+        if not isinstance(item, Future):
+            results.append(item)
+            continue
+        try:
+            results.append(item.result())
+        except Exception as e:
+            print(f"[-] [{topic}][{user_id}] 게시 중 오류:", e)
+            results.append({"topic": topic, "account": user_id, "error": str(e)})
+    return results
+
+def main(topics: list = None, workers: int = None, accounts: list = None, tasks: list = None) -> list:
+    """
+    여러 (계정, 주제) 작업을 스레드 풀에서 동시에 처리합니다.
+    주제 간 검색/LLM/업로드 호출이 겹쳐 실행되므로 전체 실행 시간은
+    모든 주제의 합이 아니라 가장 느린 주제에 가까워집니다.
+    백엔드별 동시 요청 수는 SERPER/OPENAI/THREADS_CONCURRENCY로 제한됩니다.
+    accounts를 생략하면 토큰 저장소에 등록된 모든 계정에 게시합니다.
+    tasks를 넘기면 (샤딩 러너가 나눠 준) 그 작업만 처리합니다.
+    """
+    tasks = plan_tasks(topics, accounts) if tasks is None else tasks
+    sync_quotas(tasks)
+    # 컨테이너까지만 만들고 다음 주제로 넘어감 (게시는 준비되는 순서대로 진행)
+    pending = run_tasks(tasks, lambda topic, user_id: process_topic(topic, user_id, wait=False), workers)
+    results = collect_results(tasks, pending)
+    print("[+] HTTP 연결 재사용 통계:", http_client.connection_stats())
+    print("[+] 검색 캐시 통계:", search_cache.cache_stats())
+    if GENERATION_CACHE:
+        print("[+] 생성 캐시 통계:", generation_cache_stats())
+    print("[+] 뉴스 압축으로 줄인 입력 토큰:", sum(result.get("news_tokens_saved") or 0 for result in results))
+    print("[+] 호출 한도 상태:", limiter.snapshot())
+    print("[+] LLM 클라이언트:", llm_registry.stats())
+    return results
+
+def produce(topics: list = None, accounts: list = None, target: int = None, workers: int = None,
+            tasks: list = None) -> list:
+    """
+    미리 생성한 게시물 버퍼를 채웁니다. (계정, 주제)마다 준비된 게시물이 target개보다 적으면
+    게시물을 하나 생성해 버퍼에 넣습니다. 이미 버퍼에 있는 뉴스와 거의 같은 뉴스면 LLM을 호출하지 않습니다.
+    """
+    target = target or POST_BUFFER_TARGET
+    buffer = get_post_buffer()
+
+    def fill(topic, user_id):
+        ready = buffer.ready_count(user_id, topic)
+        if ready >= target:
+            return {"topic": topic, "account": user_id, "skipped": "buffer_full", "ready": ready}
+        post = generate_post(topic, user_id, skip_news=lambda news: "buffered_news"
+                             if buffer.has_news(user_id, topic, news) else None)
+        if "text" not in post:
+            return post
+        post_id = buffer.add(user_id, topic, post["text"], news=post["news"], image_url=post["image_url"])
+        print(f"[{topic}][{user_id}] 게시물을 버퍼에 추가했습니다. (#{post_id})")
+        return {"topic": topic, "account": user_id, "buffer_id": post_id, "ready": ready + 1,
+                "news_tokens_saved": post.get("news_tokens_saved") or 0}
+
+    tasks = plan_tasks(topics, accounts) if tasks is None else tasks
+    results = run_tasks(tasks, fill, workers, kind="produce")
+    print("[+] 게시물 버퍼 상태:", buffer.stats())
+    return results
+
+def publish_from_buffer(topic: str, user_id: str = None, fallback: bool = None) -> dict:
+    """
+    버퍼에서 신선한 게시물을 꺼내 바로 업로드합니다. (검색/LLM 없이 Threads API 호출만 수행)
+    버퍼가 비어 있으면 fallback이 켜져 있을 때만 그 자리에서 생성해 게시합니다.
+    """
+    user_id = user_id or USER_ID
+    fallback = POST_BUFFER_FALLBACK if fallback is None else fallback
+    buffer = get_post_buffer()
+    while True:
+        post = buffer.claim(user_id, topic)
+        if post is None:
+            break
+        age = round(time.time() - post["created_at"], 1)
+        with metrics.span("buffer_publish", buffer_id=post["id"], age=age):
+            result = publish_generated(post, user_id, buffer_id=post["id"])
+        if result.get("skipped"):
+            # 버퍼에 있는 동안 비슷한 게시물이 먼저 올라간 경우: 버리고 다음 게시물 시도
+            buffer.discard(post["id"], result["skipped"])
+            continue
+        if "error" in result:
+            buffer.release(post, result["error"])
+        elif "scheduled_at" in result:
+            buffer.mark_scheduled(post["id"])
+        else:
+            buffer.mark_published(post["id"], result.get("container_id"))
+        return {**result, "buffered": True, "buffer_id": post["id"], "age": age}
+    if not fallback:
+        return {"topic": topic, "account": user_id, "skipped": "buffer_empty"}
+    print(f"[{topic}][{user_id}] 버퍼가 비어 있어 바로 생성합니다.")
+    return {**process_topic(topic, user_id), "buffered": False}
+
+def publish_buffered(topics: list = None, accounts: list = None, fallback: bool = None, workers: int = None,
+                     tasks: list = None) -> list:
+    tasks = plan_tasks(topics, accounts) if tasks is None else tasks
+    sync_quotas(tasks)
+    results = run_tasks(tasks, lambda topic, user_id: publish_from_buffer(topic, user_id, fallback), workers)
+    print("[+] 게시물 버퍼 상태:", get_post_buffer().stats())
+    print("[+] 호출 한도 상태:", limiter.snapshot())
+    return results
+
+def generate_tasks(tasks: list, workers: int = None) -> list:
+    """
+    작업마다 게시물을 생성만 합니다. (샤딩 러너의 자식 프로세스에서 호출, 리스와 게시는 부모가 담당)
+    """
+    return run_tasks(tasks, generate_post, workers, kind=None)
+
+def publish_sharded(tasks: list, processes: int = None, buffered: bool = None) -> list:
+    """
+    생성(검색/LLM)은 프로세스 풀에 나눠 실행하고, 게시는 모두 이 프로세스에서 수행합니다.
+    호출 한도 버킷은 SQLite로 공유되지만(RATE_LIMIT_SHARED) 게시 스케줄러의 레인은 프로세스마다 따로 있으므로,
+    게시를 한 프로세스로 모아 자식 프로세스가 생성만 하는 동안 한도 대기로 붙잡히지 않게 합니다.
+    리스는 생성부터 게시가 끝날 때까지 이 프로세스가 잡고 있습니다.
+    """
+    buffered = POST_BUFFER if buffered is None else buffered
+    sync_quotas(tasks)
+    owner = sharding.lease_owner()
+    results, leased = {}, []
+    for task in tasks:
+        if not sharding.TOPIC_LOCKS or sharding.acquire_task("publish", task, owner):
+            leased.append(task)
+        else:
+            print(f"[{task[1]}][{task[0]}] 다른 워커가 처리 중이라 건너뜁니다.")
+            results[task] = {"topic": task[1], "account": task[0], "skipped": "locked"}
+    try:
+        pending = leased
+        if buffered:
+            # 버퍼에 있는 게시물은 API 호출만 하면 되므로 바로 게시하고, 비어 있는 작업만 생성
+            pending = []
+            published = run_tasks(leased, lambda topic, user_id: publish_from_buffer(topic, user_id, fallback=False),
+                                  kind=None)
+            for task, result in zip(leased, published):
+                if result.get("skipped") == "buffer_empty" and POST_BUFFER_FALLBACK:
+                    pending.append(task)
+                else:
+                    results[task] = result
+        posts = dict(zip(pending, sharding.run_sharded("generate", pending, processes)))
+
+        def publish(topic, user_id):
+            post = posts[(user_id, topic)]
+            return publish_generated(post, user_id, wait=False) if "text" in post else post
+
+        for task, result in zip(pending, collect_results(pending, run_tasks(pending, publish, kind=None))):
+            results[task] = {**result, "buffered": False} if buffered else result
+    finally:
+        if sharding.TOPIC_LOCKS:
+            for task in leased:
+                sharding.release_task("publish", task, owner)
+    print("[+] 호출 한도 상태:", limiter.snapshot())
+    return [results[task] for task in tasks]
+
+def check_failures(results: list):
+    """
+    오류 결과가 RUN_FAILURE_RATIO 이상이면 RuntimeError를 냅니다.
+    run_tasks는 작업별 예외를 오류 결과로 바꾸므로, 이 검사가 없으면 전부 실패한 실행도 작업 큐에서 성공으로 기록됩니다.
+    """
+    errors = [result for result in results if "error" in result]
+    if results and errors and len(errors) / len(results) >= RUN_FAILURE_RATIO:
+        raise RuntimeError(f"{len(errors)}/{len(results)} tasks failed: {errors[0]['error']}")
+
+def run(topics: list = None, trace: bool = False, accounts: list = None, buffered: bool = None,
+        processes: int = None) -> dict:
+    """
+    작업 큐에서 호출하는 진입점입니다. trace가 켜져 있으면 단계별 스팬 기록을 함께 반환합니다.
+    POST_BUFFER가 켜져 있으면 미리 생성한 게시물을 게시하고, 꺼져 있으면 그 자리에서 생성해 게시합니다.
+    processes(기본 TOPIC_PROCESSES)가 2 이상이면 생성을 프로세스 풀에 나눠 실행합니다. (자식 프로세스의 스팬은 trace에 포함되지 않음)
+    """
+    buffered = POST_BUFFER if buffered is None else buffered
+    processes = processes or sharding.TOPIC_PROCESSES
+    run_trace = metrics.RunTrace()
+    with metrics.use_trace(run_trace):
+        if processes > 1:
+            results = publish_sharded(plan_tasks(topics, accounts), processes, buffered)
+        elif buffered:
+            results = publish_buffered(topics, accounts)
+        else:
+            results = main(topics, accounts=accounts)
+    check_failures(results)
+    return {"results": results, "trace": run_trace.to_dict() if trace else None}
+
+def produce_run(topics: list = None, trace: bool = False, accounts: list = None, processes: int = None) -> dict:
+    """
+    작업 큐에서 호출하는 버퍼 채우기 진입점입니다.
+    """
+    processes = processes or sharding.TOPIC_PROCESSES
+    run_trace = metrics.RunTrace()
+    with metrics.use_trace(run_trace):
+        if processes > 1:
+            results = sharding.run_sharded("produce", plan_tasks(topics, accounts), processes)
         else:
-            print("[-] 액세스 토큰 만료 혹은 오류")
+            results = produce(topics, accounts)
+    check_failures(results)
+    return {"results": results, "trace": run_trace.to_dict() if trace else None}
 
 if __name__ == "__main__":
     main()
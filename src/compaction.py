@@ -0,0 +1,210 @@
+import os
+import re
+import math
+import threading
+from datetime import datetime
+from src.ranking import similarity
+
+# 뉴스 압축 설정: 검색 결과를 프롬프트에 넣기 전에 중복/상투 문구를 걷어내고 토큰 예산 안으로 줄임
+NEWS_COMPACTION = os.getenv("NEWS_COMPACTION", "true").lower() in ("1", "true", "yes")
+NEWS_TOKEN_BUDGET = int(os.getenv("NEWS_TOKEN_BUDGET", "600"))
+# 이 값 이상 비슷한 스니펫은 하나만 남김 (글자 3-gram 자카드 유사도)
+NEWS_DUP_SIMILARITY = float(os.getenv("NEWS_DUP_SIMILARITY", "0.6"))
+# 최신성 점수가 절반이 되는 시간
+NEWS_RECENCY_HALF_LIFE_HOURS = float(os.getenv("NEWS_RECENCY_HALF_LIFE_HOURS", "24"))
+NEWS_RECENCY_WEIGHT = float(os.getenv("NEWS_RECENCY_WEIGHT", "0.4"))
+NEWS_RELEVANCE_WEIGHT = float(os.getenv("NEWS_RELEVANCE_WEIGHT", "0.4"))
+# 생성 모델과 같은 토크나이저 (tiktoken 인코딩을 쓸 수 없으면 근사치로 계산)
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "o200k_base")
+
+# 날짜를 모를 때 가정하는 기사 나이 (시간)
+UNKNOWN_AGE_HOURS = 24.0
+RESULT_KEYS = ("news", "topStories", "organic")
+STOPWORDS = {"news", "the", "a", "an", "of", "and", "or", "in", "on", "for", "to"}
+
+BOILERPLATE_PATTERNS = [
+    # 스니펫 앞에 붙는 날짜 ("3 hours ago — ", "Jan 5, 2025 ... ")
+    re.compile(r"^\s*(\d+\s+(?:minute|hour|day|week|month)s?\s+ago|[A-Z][a-z]{2,8}\.? \d{1,2}, \d{4})\s*[-—–·.…]+\s*"),
+    re.compile(r"\b(read more|continue reading|click here|learn more|subscribe( now)?|sign up( now)?|"
+               r"all rights reserved|see more|watch now|advertisement)\b[.:!…]*", re.IGNORECASE),
+    re.compile(r"(\.\.\.|…)\s*$"),
+    re.compile(r"^\s*(\.\.\.|…)\s*"),
+]
+# format_item이 줄 앞에 붙이는 날짜 ("- [3 hours ago] ")
+# 같은 기사라도 실행 시각마다 바뀌므로 중복 판단(SimHash, 생성 캐시 키)에 쓰는 텍스트에서는 strip_dates로 지움
+DATE_PREFIX_RE = re.compile(r"^(-\s*)\[[^\]]*\]\s*", re.MULTILINE)
+RELATIVE_DATE_RE = re.compile(r"(\d+)\s+(minute|hour|day|week|month|year)s?\s+ago", re.IGNORECASE)
+HOURS_PER_UNIT = {"minute": 1 / 60, "hour": 1, "day": 24, "week": 24 * 7, "month": 24 * 30, "year": 24 * 365}
+ABSOLUTE_DATE_FORMATS = ("%b %d, %Y", "%B %d, %Y", "%b. %d, %Y", "%Y-%m-%d")
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_encoding_failed = False
+
+
+def _get_encoding():
+    """
+    tiktoken 인코딩을 한 번만 불러옵니다. 설치되지 않았거나 인코딩 파일을 받을 수 없으면 None을 반환합니다.
+    """
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        with _encoding_lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+                except Exception as e:
+                    _encoding_failed = True
+                    print("[-] tiktoken 인코딩을 불러오지 못해 근사 토큰 수를 사용합니다:", e.__class__.__name__)
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    LLM 입력 토큰 수를 셉니다. tiktoken이 없으면 영문은 4글자당 1토큰, 그 외 문자는 1글자당 1토큰으로 근사합니다.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """
+    텍스트를 budget 토큰 이하로 자릅니다. (tiktoken이 없으면 근사 토큰 수 기준)
+    """
+    if count_tokens(text) <= budget:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:max(0, budget)])
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+
+def strip_boilerplate(text: str) -> str:
+    text = re.sub(r"\s+", " ", text or "").strip()
+    for pattern in BOILERPLATE_PATTERNS:
+        text = pattern.sub("", text)
+    return re.sub(r"\s+", " ", text).strip(" -—–·|")
+
+
+def age_hours(date: str, now: datetime = None) -> float:
+    """
+    Serper의 date 값("5 hours ago", "Jan 5, 2025")을 기사 나이(시간)로 바꿉니다. 알 수 없으면 None을 반환합니다.
+    """
+    if not date:
+        return None
+    match = RELATIVE_DATE_RE.search(date)
+    if match:
+        return int(match.group(1)) * HOURS_PER_UNIT[match.group(2).lower()]
+    now = now or datetime.now()
+    for fmt in ABSOLUTE_DATE_FORMATS:
+        try:
+            return max(0.0, (now - datetime.strptime(date.strip(), fmt)).total_seconds() / 3600)
+        except ValueError:
+            continue
+    return None
+
+
+def _terms(text: str) -> set:
+    return {word for word in re.findall(r"\w+", text.lower()) if len(word) > 1 and word not in STOPWORDS}
+
+
+def collect_items(results: dict) -> list:
+    """
+    검색 결과에서 (제목, 스니펫, 날짜, 원래 순위)를 가진 항목 목록을 뽑습니다.
+    """
+    items = []
+    for key in RESULT_KEYS:
+        for entry in results.get(key) or []:
+            title = strip_boilerplate(entry.get("title", ""))
+            snippet = strip_boilerplate(entry.get("snippet", ""))
+            if not title and not snippet:
+                continue
+            items.append({"title": title, "snippet": snippet, "date": entry.get("date"), "rank": len(items)})
+    answer = (results.get("answerBox") or {}).get("snippet") or (results.get("answerBox") or {}).get("answer")
+    if answer:
+        items.insert(0, {"title": "", "snippet": strip_boilerplate(answer), "date": None, "rank": -1})
+    return items
+
+
+def score_items(items: list, topic: str) -> list:
+    """
+    최신성(date), 주제 관련도(주제 단어 포함 비율), 원래 검색 순위를 합쳐 항목별 점수를 매깁니다.
+    """
+    topic_terms = _terms(topic)
+    total = max(1, len(items))
+    for item in items:
+        age = age_hours(item["date"])
+        recency = 0.5 ** ((UNKNOWN_AGE_HOURS if age is None else age) / NEWS_RECENCY_HALF_LIFE_HOURS)
+        terms = _terms(f"{item['title']} {item['snippet']}")
+        relevance = len(topic_terms & terms) / len(topic_terms) if topic_terms else 0.0
+        position = 1 - max(0, item["rank"]) / total
+        item["score"] = (NEWS_RECENCY_WEIGHT * recency + NEWS_RELEVANCE_WEIGHT * relevance
+                         + (1 - NEWS_RECENCY_WEIGHT - NEWS_RELEVANCE_WEIGHT) * position)
+    return items
+
+
+def format_item(item: dict) -> str:
+    date = f"[{item['date']}] " if item.get("date") else ""
+    if item["title"] and item["snippet"]:
+        return f"- {date}{item['title']}: {item['snippet']}"
+    return f"- {date}{item['title'] or item['snippet']}"
+
+
+def strip_dates(news: str) -> str:
+    """
+    압축된 뉴스 텍스트에서 줄마다 붙은 날짜를 지웁니다. ("- [3 hours ago] 제목" -> "- 제목")
+    """
+    return DATE_PREFIX_RE.sub(r"\1", news or "")
+
+
+def compact(results: dict, topic: str, raw_text: str = None, budget: int = None) -> tuple:
+    """
+    검색 결과를 압축해 (뉴스 텍스트, 통계) 튜플을 반환합니다.
+    점수가 높은 순서로 거의 같은 스니펫을 건너뛰며 토큰 예산이 찰 때까지 항목을 담습니다.
+    예산에 들어가는 항목이 하나도 없으면 점수가 가장 높은 항목을 예산에 맞게 자릅니다.
+    raw_text(기존 방식으로 이어 붙인 문자열)를 넘기면 절약한 토큰 수도 계산합니다.
+    """
+    budget = budget or NEWS_TOKEN_BUDGET
+    items = sorted(score_items(collect_items(results), topic), key=lambda item: item["score"], reverse=True)
+    kept, lines = [], []
+    used = duplicates = 0
+    for item in items:
+        body = f"{item['title']} {item['snippet']}"
+        if any(similarity(body, f"{other['title']} {other['snippet']}") >= NEWS_DUP_SIMILARITY for other in kept):
+            duplicates += 1
+            continue
+        line = format_item(item)
+        tokens = count_tokens(line) + 1
+        if used + tokens > budget:
+            continue
+        kept.append(item)
+        lines.append(line)
+        used += tokens
+    if not lines and items:
+        # 스니펫 하나가 예산보다 큰 경우: 압축 전 텍스트로 돌아가지 않고 예산 안으로 자름
+        kept.append(items[0])
+        lines.append(truncate_tokens(format_item(items[0]), budget))
+    text = "\n".join(lines) if lines else truncate_tokens(raw_text or "No good Google Search Result was found", budget)
+    raw_tokens = count_tokens(raw_text) if raw_text is not None else None
+    tokens = count_tokens(text)
+    stats = {
+        "items": len(items),
+        "kept": len(kept),
+        "duplicates": duplicates,
+        "raw_tokens": raw_tokens,
+        "tokens": tokens,
+        "saved": max(0, raw_tokens - tokens) if raw_tokens is not None else None,
+    }
+    return text, stats
@@ -0,0 +1,105 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# 미디어 컨테이너 상태 확인 설정
+# 첫 확인까지의 대기 시간과 최대 확인 간격 (초, 확인할 때마다 2배씩 늘어남)
+CONTAINER_POLL_INITIAL = float(os.getenv("CONTAINER_POLL_INITIAL", "1"))
+CONTAINER_POLL_MAX_INTERVAL = float(os.getenv("CONTAINER_POLL_MAX_INTERVAL", "15"))
+# 이 시간 안에 FINISHED가 되지 않으면 포기
+CONTAINER_POLL_TIMEOUT = float(os.getenv("CONTAINER_POLL_TIMEOUT", "300"))
+# 상태 조회 요청을 동시에 보내는 스레드 수
+CONTAINER_POLL_WORKERS = int(os.getenv("CONTAINER_POLL_WORKERS", "4"))
+
+FINISHED = "FINISHED"
+# 더 기다려도 바뀌지 않는 상태
+FINAL_STATUSES = {"FINISHED", "PUBLISHED", "ERROR", "EXPIRED"}
+TIMEOUT = "TIMEOUT"
+
+
+class ContainerPoller:
+    """
+    여러 미디어 컨테이너의 상태를 한 스레드에서 함께 추적합니다.
+    watch()는 즉시 Future를 반환하고, 컨테이너가 최종 상태가 되면 조회 결과로 Future가 완료됩니다.
+    다음 확인 시각 순으로 힙에 넣어 두고, 실제 조회는 작은 스레드 풀에서 실행하므로
+    느린 이미지 하나가 다른 컨테이너의 확인을 막지 않습니다.
+    조회가 호출 한도에 걸려 retry_after를 돌려주면 풀 스레드에서 기다리지 않고 그 시간 뒤로 다시 예약합니다.
+    """
+
+    def __init__(self, workers: int = CONTAINER_POLL_WORKERS):
+        self._heap = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="container-poll")
+        self._thread = None
+        self._watching = 0
+
+    def watch(self, check, timeout: float = CONTAINER_POLL_TIMEOUT, initial: float = CONTAINER_POLL_INITIAL) -> Future:
+        """
+        check()는 {"status": ..., "error_message": ...} 형태의 상태 조회 결과를 반환해야 합니다.
+        아직 조회하지 못했으면 status 없이 다시 확인할 때까지의 시간(retry_after, 초)을 넣을 수 있습니다.
+        Future는 최종 상태의 조회 결과, 또는 시간 초과 시 {"status": "TIMEOUT"}으로 완료됩니다.
+        """
+        now = time.monotonic()
+        entry = {
+            "check": check,
+            "future": Future(),
+            "started": now,
+            "deadline": now + timeout,
+            "interval": initial,
+            "checks": 0,
+        }
+        with self._cond:
+            self._watching += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="container-poller", daemon=True)
+                self._thread.start()
+        self._schedule(entry, now + initial)
+        return entry["future"]
+
+    def _schedule(self, entry: dict, at: float):
+        with self._cond:
+            heapq.heappush(self._heap, (at, next(self._sequence), entry))
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, entry = heapq.heappop(self._heap)
+            self._pool.submit(self._check, entry)
+
+    def _finish(self, entry: dict, result: dict):
+        result = {**result, "checks": entry["checks"], "waited": round(time.monotonic() - entry["started"], 3)}
+        with self._cond:
+            self._watching -= 1
+        entry["future"].set_result(result)
+
+    def _check(self, entry: dict):
+        entry["checks"] += 1
+        try:
+            result = entry["check"]() or {}
+        except Exception as e:
+            # 일시적인 조회 실패는 다음 확인 때 다시 시도
+            result = {"status": None, "error_message": str(e)}
+        if result.get("status") in FINAL_STATUSES:
+            return self._finish(entry, result)
+        now = time.monotonic()
+        if now >= entry["deadline"]:
+            return self._finish(entry, {**result, "status": TIMEOUT})
+        if result.get("retry_after"):
+            # 호출 한도 대기: 조회 간격은 그대로 두고 토큰이 생기는 시각에 다시 확인
+            return self._schedule(entry, min(entry["deadline"], now + result["retry_after"]))
+        entry["interval"] = min(CONTAINER_POLL_MAX_INTERVAL, max(0.1, entry["interval"] * 2))
+        self._schedule(entry, min(entry["deadline"], now + entry["interval"]))
+
+    def pending(self) -> int:
+        with self._cond:
+            return self._watching
+
+
+container_poller = ContainerPoller()
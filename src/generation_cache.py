@@ -0,0 +1,198 @@
+import os
+import re
+import math
+import time
+import zlib
+import hashlib
+import threading
+from array import array
+from src import storage
+from src.prompt import PROMPT_VERSION
+from src.compaction import strip_dates
+
+# LLM 생성 결과 캐시 설정: 같은(또는 거의 같은) 뉴스로 다시 생성할 때 이전 출력을 재사용
+GENERATION_CACHE = os.getenv("GENERATION_CACHE", "true").lower() in ("1", "true", "yes")
+GENERATION_CACHE_PATH = os.getenv("GENERATION_CACHE_PATH", storage.data_path("generation_cache.db"))
+GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", str(60 * 60)))
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "512"))
+# 같은 뉴스에 대해 보관할 출력(변형) 수
+GENERATION_CACHE_VARIANTS = int(os.getenv("GENERATION_CACHE_VARIANTS", "3"))
+# 정확히 같은 키가 없을 때 임베딩 코사인 유사도가 이 값 이상인 뉴스의 출력을 재사용 (0이면 끔)
+GENERATION_CACHE_SIMILARITY = float(os.getenv("GENERATION_CACHE_SIMILARITY", "0.92"))
+EMBEDDING_DIM = int(os.getenv("GENERATION_CACHE_EMBEDDING_DIM", "256"))
+
+
+def normalize_news(news: str) -> str:
+    """
+    뉴스 텍스트를 캐시 키용으로 정규화합니다. 날짜 접두어를 지우고, 공백/대소문자를 맞추고,
+    점수 변화로 줄 순서만 바뀐 경우도 같은 키가 되도록 줄을 정렬합니다.
+    """
+    lines = {re.sub(r"\s+", " ", line).strip().lower() for line in strip_dates(news).splitlines()}
+    return "\n".join(sorted(line for line in lines if line))
+
+
+def make_key(topic: str, news: str, model: str, prompt_version: str = PROMPT_VERSION) -> str:
+    value = "\x1f".join([topic.strip().lower(), normalize_news(news), prompt_version, model])
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def embed(text: str, dim: int = EMBEDDING_DIM) -> array:
+    """
+    외부 모델 없이 로컬에서 계산하는 임베딩입니다.
+    단어와 글자 3-gram을 부호 있는 해싱(feature hashing)으로 dim차원에 더한 뒤 L2 정규화합니다.
+    """
+    vector = array("f", [0.0]) * dim
+    features = re.findall(r"\w+", text)
+    features += [text[i:i + 3] for i in range(max(0, len(text) - 2))]
+    for feature in features:
+        value = zlib.crc32(feature.encode("utf-8"))
+        vector[value % dim] += 1.0 if value & 0x80000000 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return array("f", (x / norm for x in vector))
+
+
+def cosine(a: array, b: array) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+class GenerationCache:
+    """
+    (주제, 정규화된 뉴스, 프롬프트 버전, 모델) 키별로 LLM 출력 변형을 SQLite에 보관합니다.
+    정확히 같은 키가 없으면 같은 주제/모델의 항목 중 뉴스 임베딩이 충분히 가까운 키를 찾습니다.
+    TTL이 지나면 쓰지 않고, 최대 개수를 넘으면 가장 오래 쓰이지 않은 출력부터 지웁니다. (여러 워커가 공유)
+    변형 하나는 한 계정에만 배정되므로(used_by), 게시 이력에 기록되기 전이라도 두 계정이 같은 글을 올리지 않습니다.
+    """
+
+    def __init__(self, path: str = GENERATION_CACHE_PATH, max_entries: int = GENERATION_CACHE_MAX_ENTRIES,
+                 ttl: int = GENERATION_CACHE_TTL, variants: int = GENERATION_CACHE_VARIANTS,
+                 similarity: float = GENERATION_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.variants = variants
+        self.similarity = similarity
+        self._conn = storage.connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, topic TEXT NOT NULL, model TEXT NOT NULL, "
+            "prompt_version TEXT NOT NULL, embedding BLOB NOT NULL, text TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0, "
+            "used_by TEXT, created_at REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+            "UNIQUE (key, text))"
+        )
+        storage.add_column(self._conn, "generations", "used_by", "TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_generations_key ON generations(key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_generations_scope ON generations(topic, model, prompt_version)")
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "exhausted": 0, "stores": 0, "evictions": 0}
+
+    def _variants(self, key: str, now: float, account: str) -> list:
+        # 이 계정이 이미 배정받은 변형(게시 실패 후 재시도)을 먼저, 그다음 아직 아무도 쓰지 않은 변형
+        rows = self._conn.execute(
+            "SELECT id, text FROM generations WHERE key = ? AND expires_at > ? AND (used_by IS NULL OR used_by IS ?) "
+            "ORDER BY used_by IS NULL, created_at",
+            (key, now, account),
+        ).fetchall()
+        return [{"id": row["id"], "text": row["text"]} for row in rows]
+
+    def _find_key(self, topic: str, news: str, model: str, now: float) -> tuple:
+        """
+        정확히 같은 키, 없으면 뉴스 임베딩이 가장 가까운 키의 (키, 유사도)를 반환합니다.
+        """
+        key = make_key(topic, news, model)
+        if self._conn.execute("SELECT 1 FROM generations WHERE key = ? AND expires_at > ? LIMIT 1",
+                              (key, now)).fetchone():
+            return key, 1.0
+        if self.similarity <= 0:
+            return None, 0.0
+        vector = embed(normalize_news(news))
+        rows = self._conn.execute(
+            "SELECT key, embedding FROM generations WHERE topic = ? AND model = ? AND prompt_version = ? "
+            "AND expires_at > ? GROUP BY key",
+            (topic, model, PROMPT_VERSION, now),
+        ).fetchall()
+        best_key, similarity = None, 0.0
+        for row in rows:
+            score = cosine(vector, array("f", row["embedding"]))
+            if score > similarity:
+                best_key, similarity = row["key"], score
+        return (best_key, similarity) if similarity >= self.similarity else (None, similarity)
+
+    def claim(self, topic: str, news: str, model: str, account: str = None, accept=None) -> tuple:
+        """
+        재사용할 변형 하나를 account에 배정하고 (변형, 결과)를 반환합니다.
+        결과는 hit/semantic(재사용), exhausted(변형은 있지만 모두 다른 계정이 썼거나 accept가 거절), miss입니다.
+        accept(text)는 게시할 텍스트(보정 결과) 또는 None을 반환하며, 조회부터 배정까지 BEGIN IMMEDIATE
+        트랜잭션 하나에서 수행되므로 여러 워커/프로세스가 같은 변형을 동시에 가져가지 않습니다.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                key, similarity = self._find_key(topic, news, model, now)
+                variant, result = None, "miss"
+                if key is not None:
+                    result = "exhausted"
+                    for candidate in self._variants(key, now, account):
+                        text = accept(candidate["text"]) if accept else candidate["text"]
+                        if text:
+                            variant = {**candidate, "text": text, "similarity": round(similarity, 4)}
+                            result = "hit" if similarity >= 1.0 else "semantic"
+                            self._conn.execute(
+                                "UPDATE generations SET used_by = ?, hits = hits + 1, accessed_at = ? WHERE id = ?",
+                                (account, now, candidate["id"]),
+                            )
+                            break
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.stats[{"hit": "hits", "semantic": "semantic_hits", "miss": "misses"}.get(result, result)] += 1
+        return variant, result
+
+    def store(self, topic: str, news: str, model: str, texts: list, account: str = None):
+        """
+        생성한 출력을 변형으로 저장합니다. 키당 variants개를 넘으면 오래된 변형부터 지웁니다.
+        texts[0]은 account가 지금 게시할 출력이므로 그 계정에 배정된 것으로 기록합니다.
+        """
+        now = time.time()
+        key = make_key(topic, news, model)
+        embedding = embed(normalize_news(news)).tobytes()
+        with self._lock:
+            for index, text in enumerate(texts):
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO generations (key, topic, model, prompt_version, embedding, text, used_by, "
+                    "created_at, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, topic, model, PROMPT_VERSION, embedding, text, account if index == 0 else None,
+                     now, now + self.ttl, now),
+                )
+                self.stats["stores"] += 1
+            self._conn.execute(
+                "DELETE FROM generations WHERE key = ? AND id NOT IN "
+                "(SELECT id FROM generations WHERE key = ? ORDER BY created_at DESC, id DESC LIMIT ?)",
+                (key, key, self.variants),
+            )
+            self._conn.execute("DELETE FROM generations WHERE expires_at < ?", (now,))
+            count = self._conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM generations WHERE id IN (SELECT id FROM generations ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.stats["evictions"] += overflow
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_generation_cache() -> GenerationCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GenerationCache()
+    return _cache
+
+
+def cache_stats() -> dict:
+    return dict(get_generation_cache().stats)
@@ -0,0 +1,224 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import Counter
+from functools import lru_cache
+from src import storage
+from src.compaction import strip_dates
+
+# 게시물 이력 설정
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", storage.data_path("history.db"))
+# 이 시간 안에 다룬 뉴스/게시물만 중복으로 판단
+HISTORY_WINDOW_HOURS = float(os.getenv("HISTORY_WINDOW_HOURS", "72"))
+# SimHash 해밍 거리 임계값 (이 값 이하면 거의 같은 내용으로 간주)
+NEAR_DUP_DISTANCE = int(os.getenv("NEAR_DUP_DISTANCE", "3"))
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 4
+_MASK = (1 << SIMHASH_BITS) - 1
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+# 비트마다 32비트 카운터 칸(lane)을 두고, 해시의 바이트 위치/값마다 해당 비트 칸에 1을 더한 큰 정수를 미리 만들어 둠
+# (shingle마다 64비트를 하나씩 도는 대신 바이트 8개를 더하는 것으로 비트별 개수를 한꺼번에 셈)
+_LANE_BITS = 32
+_LANE_MASK = (1 << _LANE_BITS) - 1
+_BYTE_LANES = [
+    [sum(1 << (_LANE_BITS * ((7 - position) * 8 + bit)) for bit in range(8) if value >> bit & 1) for value in range(256)]
+    for position in range(8)
+]
+
+
+@lru_cache(maxsize=1024)
+def simhash(text: str) -> int:
+    """
+    글자 4-gram shingle에 대한 64비트 SimHash를 계산합니다.
+    내용이 비슷한 글일수록 해시의 해밍 거리가 작습니다.
+    같은 뉴스/게시물로 find_news, find_post, record를 차례로 호출하므로 결과를 캐싱합니다.
+    """
+    text = _normalize(text)
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+    digests = b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles)
+    counts = 0
+    for position in range(8):
+        lanes = _BYTE_LANES[position]
+        for byte, count in Counter(digests[position::8]).items():
+            counts += lanes[byte] * count
+    # 1인 shingle이 더 많은 비트(가중치 > 0)만 켬
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        if 2 * (counts >> (_LANE_BITS * bit) & _LANE_MASK) > len(shingles):
+            value |= 1 << bit
+    return value
+
+
+def news_simhash(news: str) -> int:
+    """
+    뉴스 텍스트의 SimHash입니다. 줄마다 붙은 상대 날짜("[3 hours ago]")는 한 시간 뒤 같은 기사에서도
+    바뀌어 해밍 거리를 키우므로 지우고 계산합니다.
+    """
+    return simhash(strip_dates(news))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _to_signed(value: int) -> int:
+    # SQLite INTEGER는 부호 있는 64비트이므로 변환하여 저장
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value & _MASK
+
+
+class SimHashIndex:
+    """
+    SimHash 근접 중복 색인입니다.
+    64비트를 (거리 임계값 + 1)개 이상의 밴드로 나누면, 거리 임계값 이하인 두 해시는
+    비둘기집 원리에 따라 적어도 한 밴드가 완전히 일치합니다.
+    따라서 밴드별 해시 테이블 조회만으로 후보를 찾고, 후보에 대해서만 해밍 거리를 계산합니다.
+    """
+
+    def __init__(self, distance: int = NEAR_DUP_DISTANCE):
+        self.distance = distance
+        self.bands = next(b for b in (2, 4, 8, 16, 32, 64) if b > distance)
+        self.band_bits = SIMHASH_BITS // self.bands
+        self._tables = [{} for _ in range(self.bands)]
+        self._items = {}
+
+    def _band_keys(self, value: int):
+        mask = (1 << self.band_bits) - 1
+        for band in range(self.bands):
+            yield band, value >> (band * self.band_bits) & mask
+
+    def add(self, item_id, value: int, created_at: float, group: str = None):
+        if item_id in self._items:
+            return
+        self._items[item_id] = (value, created_at, group)
+        for band, key in self._band_keys(value):
+            self._tables[band].setdefault(key, []).append(item_id)
+
+    def query(self, value: int, since: float = 0.0, group: str = None):
+        """
+        거리 임계값 이하인 가장 가까운 항목의 (id, 거리)를 반환하고, 없으면 None을 반환합니다.
+        group이 주어지면 같은 group(계정)으로 추가된 항목만 비교합니다.
+        """
+        best = None
+        seen = set()
+        for band, key in self._band_keys(value):
+            for item_id in self._tables[band].get(key, ()):
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+                item_value, created_at, item_group = self._items[item_id]
+                if created_at < since or (group is not None and item_group != group):
+                    continue
+                distance = hamming(value, item_value)
+                if distance <= self.distance and (best is None or distance < best[1]):
+                    best = (item_id, distance)
+        return best
+
+    def __len__(self):
+        return len(self._items)
+
+
+class PostHistory:
+    """
+    업로드한 게시물과 원본 뉴스의 이력을 SQLite에 저장하고,
+    뉴스/게시물 각각의 SimHash 색인을 메모리에 유지합니다.
+    다른 프로세스(gunicorn 워커, 샤딩 자식 프로세스)도 같은 DB에 기록하므로,
+    조회할 때마다 마지막으로 읽은 id 이후의 행을 색인에 추가합니다.
+    """
+
+    def __init__(self, path: str = HISTORY_DB_PATH, window_hours: float = HISTORY_WINDOW_HOURS):
+        self.window = window_hours * 60 * 60
+        self._conn = storage.connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS posts ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT, account TEXT, news_hash INTEGER, "
+            "post_hash INTEGER, text TEXT NOT NULL, container_id TEXT, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts(created_at)")
+        self.news_index = SimHashIndex()
+        self.post_index = SimHashIndex()
+        self._last_id = 0
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        """
+        아직 색인에 없는 최근 행을 읽어 옵니다. (self._lock을 잡은 상태에서 호출)
+        """
+        since = time.time() - self.window
+        rows = self._conn.execute(
+            "SELECT id, account, news_hash, post_hash, created_at FROM posts WHERE id > ? AND created_at >= ? "
+            "ORDER BY id",
+            (self._last_id, since),
+        ).fetchall()
+        for row in rows:
+            self._last_id = max(self._last_id, row["id"])
+            if row["news_hash"] is not None:
+                self.news_index.add(row["id"], _to_unsigned(row["news_hash"]), row["created_at"], row["account"])
+            self.post_index.add(row["id"], _to_unsigned(row["post_hash"]), row["created_at"], row["account"])
+
+    def find_news(self, news: str, account: str = None):
+        """
+        최근에 다룬 뉴스와 거의 같은 뉴스면 (이력 id, 거리)를 반환합니다.
+        account가 주어지면 해당 계정이 다룬 뉴스만 비교합니다.
+        """
+        value = news_simhash(news)
+        with self._lock:
+            self._load()
+            return self.news_index.query(value, time.time() - self.window, account)
+
+    def find_post(self, text: str):
+        """
+        최근에 올린 게시물과 거의 같은 게시물이면 (이력 id, 거리)를 반환합니다.
+        """
+        value = simhash(text)
+        with self._lock:
+            self._load()
+            return self.post_index.query(value, time.time() - self.window)
+
+    def record(self, topic: str, news: str, text: str, account: str = None, container_id: str = None) -> int:
+        now = time.time()
+        news_hash = news_simhash(news) if news else None
+        post_hash = simhash(text)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO posts (topic, account, news_hash, post_hash, text, container_id, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (topic, account, _to_signed(news_hash) if news_hash is not None else None,
+                 _to_signed(post_hash), text, container_id, now),
+            )
+            post_id = cursor.lastrowid
+            if news_hash is not None:
+                self.news_index.add(post_id, news_hash, now, account)
+            self.post_index.add(post_id, post_hash, now, account)
+        return post_id
+
+    def recent_texts(self, limit: int = 50) -> list:
+        with self._lock:
+            rows = self._conn.execute("SELECT text FROM posts ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [row["text"] for row in rows]
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history() -> PostHistory:
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = PostHistory()
+    return _history
@@ -0,0 +1,106 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# HTTP 클라이언트 설정 (환경 변수로 조정)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+# 호스트별 풀 크기 (예: "graph.threads.net=4,google.serper.dev=8")
+HTTP_HOST_POOL_SIZES = os.getenv("HTTP_HOST_POOL_SIZES", "graph.threads.net=4,google.serper.dev=8")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _parse_host_pool_sizes(value: str) -> dict:
+    """
+    "host=size,host=size" 형식의 문자열을 {host: size} 딕셔너리로 변환합니다.
+    """
+    sizes = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        host, size = item.split("=", 1)
+        sizes[host.strip()] = int(size)
+    return sizes
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update({"Connection": "keep-alive"})
+    default_adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("https://", default_adapter)
+    session.mount("http://", default_adapter)
+    # 호스트별 전용 어댑터: 가장 긴 prefix가 우선 매칭됨
+    for host, size in _parse_host_pool_sizes(HTTP_HOST_POOL_SIZES).items():
+        session.mount(f"https://{host}", HTTPAdapter(pool_connections=1, pool_maxsize=size))
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    프로세스 전체에서 공유하는 keep-alive 세션을 반환합니다.
+    같은 호스트에 대한 연속 호출은 풀에 남아있는 연결을 재사용하여
+    TCP/TLS 핸드셰이크 비용을 한 번만 지불합니다.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    공유 세션으로 요청을 보냅니다. timeout을 지정하지 않으면 기본 (연결, 읽기) 타임아웃을 사용합니다.
+    """
+    kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def connection_stats() -> dict:
+    """
+    호스트별 요청 수와 새로 연 연결 수를 집계하여 연결 재사용 통계를 반환합니다.
+    reused = requests - new_connections
+    """
+    stats = {}
+    if _session is None:
+        return stats
+    adapters = {id(a): a for a in _session.adapters.values()}.values()
+    for adapter in adapters:
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.scheme}://{pool.host}"
+            entry = stats.setdefault(host, {"requests": 0, "new_connections": 0})
+            entry["requests"] += pool.num_requests
+            entry["new_connections"] += pool.num_connections
+    for entry in stats.values():
+        entry["reused"] = max(0, entry["requests"] - entry["new_connections"])
+        entry["reuse_ratio"] = round(entry["reused"] / entry["requests"], 3) if entry["requests"] else 0.0
+    return stats
+
+
+def close():
+    """
+    공유 세션과 풀에 남아있는 연결을 모두 닫습니다.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src import storage, http_client, metrics
+
+# 이미지 사전 검증 설정 (Threads 이미지 게시물 규격 기준)
+IMAGE_VALIDATION = os.getenv("IMAGE_VALIDATION", "true").lower() in ("1", "true", "yes")
+IMAGE_CACHE_PATH = os.getenv("IMAGE_CACHE_PATH", storage.data_path("images.db"))
+IMAGE_ALLOWED_TYPES = {"image/jpeg", "image/png"}
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(8 * 1024 * 1024)))
+IMAGE_MIN_WIDTH = int(os.getenv("IMAGE_MIN_WIDTH", "320"))
+IMAGE_MAX_ASPECT = float(os.getenv("IMAGE_MAX_ASPECT", "10"))
+# 크기 정보를 읽기 위해 앞부분만 받아오는 바이트 수
+IMAGE_PROBE_BYTES = int(os.getenv("IMAGE_PROBE_BYTES", "65536"))
+IMAGE_CHECK_TIMEOUT = float(os.getenv("IMAGE_CHECK_TIMEOUT", "5"))
+IMAGE_CHECK_CONCURRENCY = int(os.getenv("IMAGE_CHECK_CONCURRENCY", "4"))
+# 검증 결과 캐시 유지 시간 (초). 실패한 URL은 더 짧게 유지하여 일시적인 오류에서 회복
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", str(24 * 60 * 60)))
+IMAGE_FAILURE_TTL = float(os.getenv("IMAGE_FAILURE_TTL", str(60 * 60)))
+
+# JPEG 크기 정보가 들어 있는 SOF 마커 (DHT/JPG/DAC 마커 제외)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def sniff_type(data: bytes) -> str:
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def image_size(data: bytes) -> tuple:
+    """
+    PNG/JPEG 헤더에서 (너비, 높이)를 읽습니다. 앞부분만 받은 데이터로 충분하며, 찾지 못하면 None을 반환합니다.
+    """
+    if data.startswith(b"\x89PNG\r\n\x1a\n") and data[12:16] == b"IHDR" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data.startswith(b"\xff\xd8"):
+        index = 2
+        while index + 4 <= len(data):
+            if data[index] != 0xFF:
+                index += 1
+                continue
+            marker = data[index + 1]
+            if marker == 0xFF:
+                index += 1
+                continue
+            if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+                index += 2
+                continue
+            length = struct.unpack(">H", data[index + 2:index + 4])[0]
+            if marker in _JPEG_SOF_MARKERS and index + 9 <= len(data):
+                height, width = struct.unpack(">HH", data[index + 5:index + 9])
+                return width, height
+            index += 2 + length
+    return None
+
+
+def _total_size(response) -> int:
+    content_range = response.headers.get("Content-Range", "")
+    if "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    if response.status_code == 200 and response.headers.get("Content-Length"):
+        return int(response.headers["Content-Length"])
+    return None
+
+
+def probe(url: str) -> dict:
+    """
+    Range 요청으로 이미지 앞부분만 받아 형식, 파일 크기, 해상도를 확인합니다.
+    {"ok": bool, "reason": ..., "content_type": ..., "bytes": ..., "width": ..., "height": ...}를 반환합니다.
+    """
+    info = {"ok": False, "reason": None, "content_type": None, "bytes": None, "width": None, "height": None}
+    try:
+        response = http_client.get(url, headers={"Range": f"bytes=0-{IMAGE_PROBE_BYTES - 1}"}, stream=True,
+                                   timeout=(IMAGE_CHECK_TIMEOUT, IMAGE_CHECK_TIMEOUT), allow_redirects=True)
+        try:
+            if response.status_code not in (200, 206):
+                info["reason"] = f"http_{response.status_code}"
+                return info
+            data = b""
+            for chunk in response.iter_content(8192):
+                data += chunk
+                if len(data) >= IMAGE_PROBE_BYTES:
+                    break
+        finally:
+            response.close()
+    except Exception as e:
+        info["reason"] = f"unreachable: {e.__class__.__name__}"
+        return info
+
+    header_type = (response.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+    info["content_type"] = header_type if header_type in IMAGE_ALLOWED_TYPES else sniff_type(data) or header_type
+    info["bytes"] = _total_size(response)
+    if info["bytes"] is None and len(data) < IMAGE_PROBE_BYTES:
+        info["bytes"] = len(data)
+    size = image_size(data)
+    if size:
+        info["width"], info["height"] = size
+
+    if info["content_type"] not in IMAGE_ALLOWED_TYPES:
+        info["reason"] = f"unsupported_type: {info['content_type'] or 'unknown'}"
+    elif info["bytes"] is not None and info["bytes"] > IMAGE_MAX_BYTES:
+        info["reason"] = "too_large"
+    elif not size:
+        info["reason"] = "unknown_dimensions"
+    else:
+        info["reason"] = check_dimensions(*size)
+    info["ok"] = info["reason"] is None
+    return info
+
+
+def check_dimensions(width: int, height: int) -> str:
+    """
+    규격에 맞지 않으면 이유를, 맞으면 None을 반환합니다.
+    """
+    if not width or not height:
+        return "unknown_dimensions"
+    if width < IMAGE_MIN_WIDTH:
+        return "too_narrow"
+    if max(width, height) / min(width, height) > IMAGE_MAX_ASPECT:
+        return "bad_aspect_ratio"
+    return None
+
+
+class ImageCheckCache:
+    """
+    URL별 검증 결과를 SQLite에 저장합니다. 같은 이미지가 다시 검색되면 네트워크 요청 없이 결과를 재사용합니다.
+    """
+
+    def __init__(self, path: str = IMAGE_CACHE_PATH):
+        self._conn = storage.connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_checks ("
+            "url TEXT PRIMARY KEY, ok INTEGER NOT NULL, info TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, url: str) -> dict:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT info FROM image_checks WHERE url = ? AND expires_at >= ?", (url, time.time())
+            ).fetchone()
+            self.stats["hits" if row else "misses"] += 1
+        return json.loads(row["info"]) if row else None
+
+    def set(self, url: str, info: dict):
+        ttl = IMAGE_CACHE_TTL if info["ok"] else IMAGE_FAILURE_TTL
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_checks (url, ok, info, expires_at) VALUES (?, ?, ?, ?)",
+                (url, int(info["ok"]), json.dumps(info), now + ttl),
+            )
+            self._conn.execute("DELETE FROM image_checks WHERE expires_at < ?", (now,))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=IMAGE_CHECK_CONCURRENCY, thread_name_prefix="image-check")
+
+
+def get_cache() -> ImageCheckCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ImageCheckCache()
+    return _cache
+
+
+def _check(url: str) -> dict:
+    info = probe(url)
+    get_cache().set(url, info)
+    metrics.inc("bot_image_checks_total", result="ok" if info["ok"] else info["reason"].split(":")[0])
+    return info
+
+
+def verify(url: str) -> dict:
+    """
+    캐시된 결과가 있으면 재사용하고, 없으면 이미지를 검사해 결과를 캐시합니다.
+    """
+    return get_cache().get(url) or _check(url)
+
+
+def pick_image(images: list) -> str:
+    """
+    Serper 이미지 검색 결과(순서대로 선호) 중 규격을 통과하는 이미지 URL 하나를 반환합니다.
+    검색 결과에 포함된 해상도로 먼저 거르고, 남은 후보는 동시에 검사하여
+    가장 먼저 통과한 후보를 고릅니다. 통과한 이미지가 없으면 None을 반환합니다.
+    """
+    candidates = []
+    for image in images:
+        url = image.get("imageUrl")
+        if not url or not url.startswith(("http://", "https://")):
+            continue
+        if image.get("imageWidth") and image.get("imageHeight") and \
+                check_dimensions(image["imageWidth"], image["imageHeight"]):
+            continue
+        candidates.append(url)
+    if not IMAGE_VALIDATION:
+        return candidates[0] if candidates else None
+
+    cache = get_cache()
+    unchecked = []
+    for url in candidates:
+        info = cache.get(url)
+        if info is None:
+            unchecked.append(url)
+        elif info["ok"]:
+            return url
+    futures = {_pool.submit(_check, url): url for url in unchecked}
+    for future in as_completed(futures):
+        try:
+            if future.result()["ok"]:
+                return futures[future]
+        except Exception as e:
+            print("[-] 이미지 검사 중 오류:", futures[future], e)
+    return None
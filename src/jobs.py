@@ -0,0 +1,375 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from src import storage
+
+# 작업 큐 설정
+JOB_BACKEND = os.getenv("JOB_BACKEND", "sqlite")  # sqlite | memory
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", storage.data_path("jobs.db"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE = float(os.getenv("JOB_RETRY_BASE", "30"))  # 재시도 대기 시간 기준 (초, 지수 증가)
+JOB_RETRY_MAX = float(os.getenv("JOB_RETRY_MAX", "1800"))
+# 실행 중인 작업의 lease는 JOB_LEASE_SECONDS/3마다 연장되며, 연장이 끊긴(워커가 죽은) 작업은 이 시간 뒤 다른 워커가 회수
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def retry_delay(attempts: int) -> float:
+    return min(JOB_RETRY_MAX, JOB_RETRY_BASE * (2 ** max(0, attempts - 1)))
+
+
+class SQLiteJobBackend:
+    """
+    SQLite 기반 영속 작업 큐입니다.
+    같은 DB 파일을 공유하면 여러 gunicorn 워커/프로세스가 안전하게 작업을 나눠 가져갑니다.
+    작업 선점(claim)은 BEGIN IMMEDIATE 트랜잭션 안에서 수행되어 한 작업이 두 번 실행되지 않으며,
+    실행 중 프로세스가 죽으면 lease가 만료된 뒤 다른 워커가 회수합니다.
+    선점할 때마다 새 lease_token을 발급하고 연장/완료/실패는 그 토큰이 맞을 때만 반영되므로,
+    lease를 잃은 뒤 늦게 끝난 워커가 회수한 워커의 상태를 덮어쓰지 않습니다.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self._conn = storage.connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+            "run_at REAL NOT NULL, lease_until REAL, worker TEXT, idempotency_key TEXT UNIQUE, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL, lease_token TEXT)"
+        )
+        storage.add_column(self._conn, "jobs", "lease_token", "TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs(status, run_at)")
+
+    def enqueue(self, kind: str, payload: dict, idempotency_key: str = None, max_attempts: int = JOB_MAX_ATTEMPTS,
+                run_at: float = None) -> dict:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, kind, payload, status, max_attempts, run_at, "
+                "idempotency_key, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload, ensure_ascii=False), QUEUED, max_attempts, run_at or now,
+                 idempotency_key, now, now),
+            )
+            if idempotency_key:
+                row = self._conn.execute("SELECT * FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+            else:
+                row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row)
+
+    def claim(self, worker: str, lease: float = JOB_LEASE_SECONDS) -> dict:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self._conn.execute(
+                        "SELECT * FROM jobs WHERE (status = ? AND run_at <= ?) OR (status = ? AND lease_until < ?) "
+                        "ORDER BY run_at LIMIT 1",
+                        (QUEUED, now, RUNNING, now),
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+                    if row["status"] == RUNNING and row["attempts"] >= row["max_attempts"]:
+                        # 실행 중 죽은 작업이 재시도 한도를 모두 쓴 경우
+                        self._conn.execute(
+                            "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                            (FAILED, "lease expired", now, row["id"]),
+                        )
+                        continue
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, worker = ?, "
+                        "lease_token = ?, updated_at = ? WHERE id = ?",
+                        (RUNNING, now + lease, worker, uuid.uuid4().hex, now, row["id"]),
+                    )
+                    job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                    self._conn.execute("COMMIT")
+                    return _row_to_job(job)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def renew(self, job_id: str, token: str, lease: float = JOB_LEASE_SECONDS) -> bool:
+        """
+        실행 중인 작업의 lease를 연장합니다. 그사이 다른 워커가 회수했으면 False를 반환합니다.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = ? AND lease_token = ?",
+                (time.time() + lease, time.time(), job_id, RUNNING, token),
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: str, result, token: str = None) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, lease_token = NULL, "
+                "updated_at = ? WHERE id = ? AND (? IS NULL OR lease_token = ?)",
+                (SUCCEEDED, json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id, token, token),
+            )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: str, error: str, retry_at: float = None, token: str = None) -> bool:
+        status = QUEUED if retry_at is not None else FAILED
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, run_at = COALESCE(?, run_at), lease_until = NULL, "
+                "lease_token = NULL, updated_at = ? WHERE id = ? AND (? IS NULL OR lease_token = ?)",
+                (status, error, retry_at, time.time(), job_id, token, token),
+            )
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> dict:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list(self, status: str = None, limit: int = 50) -> list:
+        with self._lock:
+            if status:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+
+class MemoryJobBackend:
+    """
+    프로세스 내 메모리 작업 큐입니다. (단일 프로세스 개발/테스트용, 재시작 시 작업이 사라짐)
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, kind: str, payload: dict, idempotency_key: str = None, max_attempts: int = JOB_MAX_ATTEMPTS,
+                run_at: float = None) -> dict:
+        now = time.time()
+        with self._lock:
+            if idempotency_key and idempotency_key in self._keys:
+                return dict(self._jobs[self._keys[idempotency_key]])
+            job = {
+                "id": uuid.uuid4().hex, "kind": kind, "payload": payload, "status": QUEUED,
+                "attempts": 0, "max_attempts": max_attempts, "run_at": run_at or now, "lease_until": None,
+                "worker": None, "idempotency_key": idempotency_key, "result": None, "error": None,
+                "created_at": now, "updated_at": now, "lease_token": None,
+            }
+            self._jobs[job["id"]] = job
+            if idempotency_key:
+                self._keys[idempotency_key] = job["id"]
+            return dict(job)
+
+    def claim(self, worker: str, lease: float = JOB_LEASE_SECONDS) -> dict:
+        now = time.time()
+        with self._lock:
+            ready = [
+                job for job in self._jobs.values()
+                if (job["status"] == QUEUED and job["run_at"] <= now)
+                or (job["status"] == RUNNING and job["lease_until"] < now)
+            ]
+            for job in sorted(ready, key=lambda j: j["run_at"]):
+                if job["status"] == RUNNING and job["attempts"] >= job["max_attempts"]:
+                    job.update(status=FAILED, error="lease expired", lease_until=None, updated_at=now)
+                    continue
+                job.update(status=RUNNING, attempts=job["attempts"] + 1, lease_until=now + lease,
+                           worker=worker, lease_token=uuid.uuid4().hex, updated_at=now)
+                return dict(job)
+        return None
+
+    def _owned(self, job_id: str, token: str) -> dict:
+        # 호출한 쪽이 self._lock을 잡고 있음
+        job = self._jobs[job_id]
+        return job if token is None or job["lease_token"] == token else None
+
+    def renew(self, job_id: str, token: str, lease: float = JOB_LEASE_SECONDS) -> bool:
+        with self._lock:
+            job = self._owned(job_id, token)
+            if job is None or job["status"] != RUNNING:
+                return False
+            job.update(lease_until=time.time() + lease, updated_at=time.time())
+            return True
+
+    def complete(self, job_id: str, result, token: str = None) -> bool:
+        with self._lock:
+            job = self._owned(job_id, token)
+            if job is None:
+                return False
+            job.update(status=SUCCEEDED, result=result, error=None, lease_until=None, lease_token=None,
+                       updated_at=time.time())
+            return True
+
+    def fail(self, job_id: str, error: str, retry_at: float = None, token: str = None) -> bool:
+        with self._lock:
+            job = self._owned(job_id, token)
+            if job is None:
+                return False
+            job.update(status=QUEUED if retry_at is not None else FAILED, error=error, lease_until=None,
+                       lease_token=None, updated_at=time.time())
+            if retry_at is not None:
+                job["run_at"] = retry_at
+            return True
+
+    def get(self, job_id: str) -> dict:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self, status: str = None, limit: int = 50) -> list:
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values() if not status or job["status"] == status]
+        return sorted(jobs, key=lambda j: j["created_at"], reverse=True)[:limit]
+
+
+def _row_to_job(row) -> dict:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+BACKENDS = {"sqlite": SQLiteJobBackend, "memory": MemoryJobBackend}
+
+_queue = None
+_queue_lock = threading.Lock()
+_handlers = {}
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = BACKENDS[JOB_BACKEND]()
+    return _queue
+
+
+def set_queue(queue):
+    """
+    작업 큐 백엔드를 교체합니다. (enqueue/claim/renew/complete/fail/get/list를 가진 객체면 무엇이든 가능)
+    """
+    global _queue
+    with _queue_lock:
+        _queue = queue
+
+
+def register_handler(kind: str, handler):
+    """
+    작업 종류(kind)별 실행 함수를 등록합니다. handler는 payload 딕셔너리를 키워드 인자로 받습니다.
+    """
+    _handlers[kind] = handler
+
+
+def enqueue(kind: str, payload: dict = None, idempotency_key: str = None, max_attempts: int = JOB_MAX_ATTEMPTS,
+            run_at: float = None) -> dict:
+    """
+    작업을 큐에 넣습니다. run_at(유닉스 시각)을 주면 그 시각 이후에 실행됩니다. (예약 게시)
+    """
+    return get_queue().enqueue(kind, payload or {}, idempotency_key, max_attempts, run_at)
+
+
+def get_job(job_id: str) -> dict:
+    return get_queue().get(job_id)
+
+
+def list_jobs(status: str = None, limit: int = 50) -> list:
+    return get_queue().list(status, limit)
+
+
+def _heartbeat(queue, job: dict, stop: threading.Event):
+    """
+    작업이 실행되는 동안 JOB_LEASE_SECONDS/3마다 lease를 연장합니다. lease를 잃으면 연장을 멈춥니다.
+    """
+    while not stop.wait(JOB_LEASE_SECONDS / 3):
+        try:
+            if not queue.renew(job["id"], job["lease_token"], JOB_LEASE_SECONDS):
+                print(f"[-] 작업 {job['id']}의 lease를 잃었습니다. (다른 워커가 회수)")
+                return
+        except Exception as e:
+            print(f"[-] 작업 {job['id']} lease 연장 실패:", e)
+
+
+def run_one(worker: str) -> bool:
+    """
+    실행 가능한 작업 하나를 가져와 실행합니다. 실행한 작업이 있으면 True를 반환합니다.
+    실패한 작업은 재시도 한도 안에서 지수 백오프 후 다시 큐에 들어갑니다.
+    실행 중에는 백그라운드 스레드가 lease를 연장하며, 끝났을 때 lease_token이 바뀌었으면
+    (lease를 잃고 다른 워커가 회수) 결과를 기록하지 않습니다.
+    """
+    queue = get_queue()
+    job = queue.claim(worker, JOB_LEASE_SECONDS)
+    if job is None:
+        return False
+    token = job.get("lease_token")
+    handler = _handlers.get(job["kind"])
+    if handler is None:
+        queue.fail(job["id"], f"No handler for job kind: {job['kind']}", token=token)
+        return True
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(queue, job, stop), name=f"job-heartbeat-{job['id'][:8]}",
+                                 daemon=True)
+    heartbeat.start()
+    try:
+        result = handler(**job["payload"])
+    except Exception as e:
+        retry_at = None
+        if job["attempts"] < job["max_attempts"]:
+            retry_at = time.time() + retry_delay(job["attempts"])
+        print(f"[-] 작업 {job['id']} 실패 ({job['attempts']}/{job['max_attempts']}):", e)
+        if not queue.fail(job["id"], str(e), retry_at, token=token):
+            print(f"[-] 작업 {job['id']}의 lease를 잃어 실패 결과를 기록하지 않습니다.")
+        return True
+    finally:
+        stop.set()
+    if not queue.complete(job["id"], result, token=token):
+        print(f"[-] 작업 {job['id']}의 lease를 잃어 완료 결과를 기록하지 않습니다.")
+    return True
+
+
+def _worker_loop(worker: str, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            if not run_one(worker):
+                stop.wait(JOB_POLL_INTERVAL)
+        except Exception as e:
+            print(f"[-] 작업 워커 {worker} 오류:", e)
+            stop.wait(JOB_POLL_INTERVAL)
+
+
+_workers = []
+_stop = threading.Event()
+
+
+def start_workers(count: int = JOB_WORKERS) -> list:
+    """
+    작업 워커 스레드를 시작합니다. 프로세스당 한 번만 시작되며 이미 실행 중이면 무시합니다.
+    """
+    with _queue_lock:
+        if _workers:
+            return _workers
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for index in range(count):
+            worker = f"{prefix}:{index}"
+            thread = threading.Thread(target=_worker_loop, args=(worker, _stop), name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            _workers.append(thread)
+    return _workers
+
+
+def stop_workers(timeout: float = None):
+    _stop.set()
+    for thread in _workers:
+        thread.join(timeout)
@@ -0,0 +1,96 @@
+import os
+import threading
+
+# LLM 클라이언트 설정
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.8"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+# 모든 클라이언트가 공유하는 HTTP 연결 풀 크기
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "10"))
+# 워커 시작 시 기본 클라이언트를 미리 만들어 둠
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() in ("1", "true", "yes")
+# 미리 만들 때 /models 요청을 보내 TLS 연결까지 열어 둠 (토큰 비용 없음)
+LLM_WARMUP_REQUEST = os.getenv("LLM_WARMUP_REQUEST", "false").lower() in ("1", "true", "yes")
+
+
+class LLMRegistry:
+    """
+    (모델, temperature, 추가 옵션)별 ChatOpenAI 인스턴스를 한 번만 만들어 재사용하는 레지스트리입니다.
+    모든 인스턴스가 하나의 httpx 연결 풀을 공유하므로 재생성/재시도 사이에도 keep-alive 연결이 유지됩니다.
+    ChatOpenAI와 httpx.Client는 여러 스레드에서 동시에 호출해도 안전합니다.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._http_client = None
+        self._lock = threading.Lock()
+
+    def _shared_http_client(self):
+        # openai/langchain과 마찬가지로 httpx도 처음 필요할 때 임포트
+        import httpx
+
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=OPENAI_POOL_SIZE, max_keepalive_connections=OPENAI_POOL_SIZE),
+                timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+            )
+        return self._http_client
+
+    def get(self, model: str = None, temperature: float = None, **options):
+        """
+        options에는 n, stream_usage 등 ChatOpenAI 생성 인자를 넘길 수 있으며 키의 일부가 됩니다.
+        """
+        model = model or OPENAI_MODEL
+        temperature = OPENAI_TEMPERATURE if temperature is None else temperature
+        key = (model, temperature, tuple(sorted(options.items())))
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    from langchain_openai import ChatOpenAI
+
+                    client = ChatOpenAI(model=model, temperature=temperature, timeout=OPENAI_TIMEOUT,
+                                        max_retries=OPENAI_MAX_RETRIES, http_client=self._shared_http_client(),
+                                        **options)
+                    self._clients[key] = client
+        return client
+
+    def warm_up(self, request: bool = LLM_WARMUP_REQUEST, variants: tuple = ({"stream_usage": True},)):
+        """
+        기본 모델의 클라이언트를 미리 만들고, request가 켜져 있으면 /models 요청으로 연결을 열어 둡니다.
+        실패해도 첫 생성 요청에서 다시 시도하므로 오류는 기록만 합니다.
+        """
+        clients = [self.get(**options) for options in variants]
+        if request:
+            try:
+                clients[0].root_client.models.list()
+            except Exception as e:
+                print("[-] LLM 연결 미리 열기 실패:", e.__class__.__name__)
+        return clients
+
+    def stats(self) -> dict:
+        with self._lock:
+            keys = list(self._clients)
+        return {"clients": len(keys), "keys": [f"{model}@{temperature}" + (f" {dict(options)}" if options else "")
+                                               for model, temperature, options in keys]}
+
+    def close(self):
+        with self._lock:
+            self._clients.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+
+registry = LLMRegistry()
+
+
+def get_llm(model: str = None, temperature: float = None, **options):
+    return registry.get(model, temperature, **options)
+
+
+def warm_up(request: bool = LLM_WARMUP_REQUEST):
+    return registry.warm_up(request)
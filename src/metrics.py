@@ -0,0 +1,210 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# 히스토그램 버킷
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+HELP = {
+    "bot_stage_duration_seconds": "Duration of each bot pipeline stage",
+    "bot_stage_bytes": "Payload size handled by each bot pipeline stage",
+    "bot_llm_tokens": "LLM token counts per generation",
+    "bot_llm_ttft_seconds": "LLM time to first token",
+    "bot_stage_errors_total": "Errors raised inside a bot pipeline stage",
+    "bot_retries_total": "Post regenerations caused by validation failures",
+    "bot_container_wait_seconds": "Time from media container creation until it is ready to publish",
+    "bot_image_checks_total": "Image candidate checks by result",
+    "bot_news_tokens_saved_total": "LLM input tokens removed by news compaction",
+    "bot_generation_cache_total": "Generation cache lookups by result",
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def observe(name: str, value: float, buckets=DURATION_BUCKETS, **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+
+def inc(name: str, amount: float = 1, **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+def render_prometheus() -> str:
+    """
+    Prometheus 텍스트 노출 형식(0.0.4)으로 모든 지표를 렌더링합니다.
+    """
+    lines = []
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+    described = set()
+    for (name, labels), histogram in histograms:
+        if name not in described:
+            described.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram.count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    for (name, labels), value in counters:
+        if name not in described:
+            described.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+class RunTrace:
+    """
+    한 번의 실행에서 발생한 스팬 목록입니다. /runbot?trace=1 결과로 반환됩니다.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span: dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        totals = {}
+        for span in spans:
+            totals[span["stage"]] = round(totals.get(span["stage"], 0.0) + span["duration"], 4)
+        return {"duration": round(time.perf_counter() - self.started, 4), "stage_totals": totals, "spans": spans}
+
+
+_current_trace = contextvars.ContextVar("run_trace", default=None)
+_current_topic = contextvars.ContextVar("run_topic", default=None)
+
+
+@contextmanager
+def use_trace(trace: RunTrace):
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def use_topic(topic: str):
+    token = _current_topic.set(topic)
+    try:
+        yield
+    finally:
+        _current_topic.reset(token)
+
+
+def bind(fn):
+    """
+    현재 컨텍스트(실행 trace, 주제)를 복사해 다른 스레드에서 fn을 실행하도록 감쌉니다.
+    ThreadPoolExecutor.submit/map에 넘기기 전에 사용합니다.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+class Span:
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.attrs = {}
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """
+    파이프라인 단계 하나의 실행 시간을 측정합니다.
+    span.set(bytes=..., input_tokens=..., output_tokens=..., ttft=...)로 넘긴 값은
+    해당 히스토그램에도 함께 기록되고, 실행 trace가 있으면 스팬으로 추가됩니다.
+    """
+    current = Span(stage)
+    current.set(**attrs)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield current
+    except Exception as e:
+        error = e
+        inc("bot_stage_errors_total", stage=stage)
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        observe("bot_stage_duration_seconds", duration, stage=stage)
+        if "bytes" in current.attrs:
+            observe("bot_stage_bytes", current.attrs["bytes"], BYTES_BUCKETS, stage=stage)
+        for kind in ("input_tokens", "output_tokens"):
+            if current.attrs.get(kind):
+                observe("bot_llm_tokens", current.attrs[kind], TOKEN_BUCKETS, kind=kind.split("_")[0])
+        if current.attrs.get("ttft"):
+            observe("bot_llm_ttft_seconds", current.attrs["ttft"])
+        trace = _current_trace.get()
+        if trace is not None:
+            entry = {
+                "stage": stage,
+                "topic": _current_topic.get(),
+                "start": round(started - trace.started, 4),
+                "duration": round(duration, 4),
+                **current.attrs,
+            }
+            if error is not None:
+                entry["error"] = str(error)
+            trace.add(entry)
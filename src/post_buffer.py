@@ -0,0 +1,183 @@
+import os
+import time
+import threading
+from src import storage
+from src.history import news_simhash, hamming, NEAR_DUP_DISTANCE
+
+# 미리 생성한 게시물 버퍼 설정
+POST_BUFFER_PATH = os.getenv("POST_BUFFER_PATH", storage.data_path("post_buffer.db"))
+# (계정, 주제)마다 준비해 둘 게시물 수
+POST_BUFFER_TARGET = int(os.getenv("POST_BUFFER_TARGET", "2"))
+# 생성 후 이 시간이 지난 게시물은 게시하지 않음 (뉴스 신선도)
+POST_FRESHNESS_HOURS = float(os.getenv("POST_FRESHNESS_HOURS", "6"))
+# 주제별 신선도 (예: "AI Trend=3,Weekly Recap=48")
+POST_TOPIC_FRESHNESS = os.getenv("POST_TOPIC_FRESHNESS", "")
+# 게시 실패 시 다시 시도하는 최대 횟수
+POST_BUFFER_MAX_ATTEMPTS = int(os.getenv("POST_BUFFER_MAX_ATTEMPTS", "3"))
+# 꺼낸 뒤 이 시간 안에 게시/반환되지 않으면 (워커가 죽은 것으로 보고) 다시 ready로 돌려놓음
+POST_CLAIM_TIMEOUT = float(os.getenv("POST_CLAIM_TIMEOUT", "1800"))
+
+READY = "ready"
+CLAIMED = "claimed"
+# 게시 한도 간격 때문에 예약 게시 작업으로 넘긴 게시물 (작업이 게시하면 published)
+SCHEDULED = "scheduled"
+PUBLISHED = "published"
+FAILED = "failed"
+EXPIRED = "expired"
+DISCARDED = "discarded"
+
+
+def _parse_topic_freshness(value: str) -> dict:
+    """
+    "topic=hours,topic=hours" 형식의 문자열을 {topic: hours} 딕셔너리로 변환합니다.
+    """
+    hours = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        topic, limit = item.rsplit("=", 1)
+        hours[topic.strip()] = float(limit)
+    return hours
+
+
+TOPIC_FRESHNESS = _parse_topic_freshness(POST_TOPIC_FRESHNESS)
+
+
+def freshness_for(topic: str) -> float:
+    return TOPIC_FRESHNESS.get(topic, POST_FRESHNESS_HOURS) * 60 * 60
+
+
+def _row_to_post(row) -> dict:
+    return {key: row[key] for key in row.keys() if key != "news_hash"}
+
+
+class PostBuffer:
+    """
+    검증까지 마친 게시물을 SQLite에 쌓아 두는 버퍼입니다.
+    생산자(produce)가 한가한 시간에 채우고, 게시 시점에는 claim()으로 가장 오래된 신선한 게시물을 꺼내
+    API 호출만 하면 되므로 검색/LLM 지연이 게시 경로에서 빠집니다.
+    claim은 BEGIN IMMEDIATE 트랜잭션 안에서 수행되어 여러 워커가 같은 게시물을 꺼내지 않습니다.
+    """
+
+    def __init__(self, path: str = POST_BUFFER_PATH):
+        self._conn = storage.connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buffered_posts ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, account TEXT, topic TEXT NOT NULL, text TEXT NOT NULL, "
+            "news TEXT, news_hash TEXT, image_url TEXT, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "container_id TEXT, error TEXT, created_at REAL NOT NULL, expires_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_buffered_posts_ready ON buffered_posts(status, account, topic, created_at)"
+        )
+
+    def add(self, account: str, topic: str, text: str, news: str = None, image_url: str = None) -> int:
+        now = time.time()
+        news_hash = f"{news_simhash(news):016x}" if news else None
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO buffered_posts (account, topic, text, news, news_hash, image_url, status, "
+                "created_at, expires_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (account, topic, text, news, news_hash, image_url, READY, now, now + freshness_for(topic), now),
+            )
+        return cursor.lastrowid
+
+    def has_news(self, account: str, topic: str, news: str) -> bool:
+        """
+        같은 (계정, 주제)에 거의 같은 뉴스로 만든 게시물이 이미 준비되어 있는지 확인합니다.
+        """
+        value = news_simhash(news)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT news_hash FROM buffered_posts WHERE status IN (?, ?, ?) AND account IS ? AND topic = ? "
+                "AND expires_at > ? AND news_hash IS NOT NULL",
+                (READY, CLAIMED, SCHEDULED, account, topic, time.time()),
+            ).fetchall()
+        return any(hamming(value, int(row["news_hash"], 16)) <= NEAR_DUP_DISTANCE for row in rows)
+
+    def ready_count(self, account: str, topic: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM buffered_posts WHERE status = ? AND account IS ? AND topic = ? AND expires_at > ?",
+                (READY, account, topic, time.time()),
+            ).fetchone()[0]
+
+    def claim(self, account: str, topic: str) -> dict:
+        """
+        가장 오래된 신선한 게시물 하나를 꺼내 claimed 상태로 바꿉니다. 없으면 None을 반환합니다.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE buffered_posts SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?",
+                    (READY, now, CLAIMED, now - POST_CLAIM_TIMEOUT),
+                )
+                self._conn.execute(
+                    "UPDATE buffered_posts SET status = ?, updated_at = ? WHERE status = ? AND expires_at <= ?",
+                    (EXPIRED, now, READY, now),
+                )
+                row = self._conn.execute(
+                    "SELECT * FROM buffered_posts WHERE status = ? AND account IS ? AND topic = ? "
+                    "ORDER BY created_at LIMIT 1",
+                    (READY, account, topic),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE buffered_posts SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (CLAIMED, now, row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return _row_to_post(row) if row is not None else None
+
+    def _set_status(self, post_id: int, status: str, container_id: str = None, error: str = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE buffered_posts SET status = ?, container_id = COALESCE(?, container_id), error = ?, "
+                "updated_at = ? WHERE id = ?",
+                (status, container_id, error, time.time(), post_id),
+            )
+
+    def mark_published(self, post_id: int, container_id: str = None):
+        self._set_status(post_id, PUBLISHED, container_id=container_id)
+
+    def mark_scheduled(self, post_id: int):
+        self._set_status(post_id, SCHEDULED)
+
+    def discard(self, post_id: int, reason: str):
+        self._set_status(post_id, DISCARDED, error=reason)
+
+    def release(self, post: dict, error: str):
+        """
+        게시에 실패한 게시물을 다시 ready로 돌려놓습니다. 시도 횟수를 모두 쓰면 failed로 남깁니다.
+        """
+        status = FAILED if post["attempts"] + 1 >= POST_BUFFER_MAX_ATTEMPTS else READY
+        self._set_status(post["id"], status, error=error)
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT account, topic, status, COUNT(*) AS count FROM buffered_posts GROUP BY account, topic, status"
+            ).fetchall()
+        stats = {}
+        for row in rows:
+            stats.setdefault(f"{row['account']}/{row['topic']}", {})[row["status"]] = row["count"]
+        return stats
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_post_buffer() -> PostBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = PostBuffer()
+    return _buffer
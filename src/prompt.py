@@ -1,7 +1,16 @@
-def get_prompt(topic, news):
-    prompt = f"""
+from functools import lru_cache
+
+# 프롬프트 템플릿을 고치면 올려서 생성 캐시에 남은 이전 출력을 쓰지 않도록 함
+PROMPT_VERSION = "1"
+
+# 기본 페르소나 (계정 소개 문구)
+DEFAULT_PERSONA = "PurpleAILAB 대표이자 {topic}에 관심있는 민P"
+
+# 정적 시스템 프롬프트 템플릿: 주제/페르소나만 치환하며 뉴스는 포함하지 않음
+# (매 호출마다 바이트 단위로 동일한 prefix가 되어 프롬프트 캐싱에 유리함)
+SYSTEM_TEMPLATE = """
 ### 상황과 역할 Instruction ###
-이 게시물은 Threads에서 PurpleAILAB 대표이자 {topic}에 관심있는 민P 계정에 업로드할 게시물이야.  
+이 게시물은 Threads에서 {persona} 계정에 업로드할 게시물이야.  
 목표는 독자들에게 {topic}에 관한 최신 정보와, 일반 사용자가 잘 접하지 못하는 특별한 인사이트를 제공해서 구독자를 늘리는 거야.  
 게시물 내용은 아래의 {topic} 관련 최신 뉴스를 요약 및 재해석해서, 놀라울 만큼 새로운 시각의 정보를 제공해야 해.  
 단, 가끔은 일반 Threads 사용자가 SNS에서 소통하는 듯한 일상적인 게시물 말투, 어투 Example 스타일도 혼합해서 자연스러운 느낌을 주도록 해.
@@ -34,11 +43,6 @@ def get_prompt(topic, news):
 
 ---
 
-### {topic}과 관련된 최신 뉴스 ###
-{news}
-
----
-
 ### Threads에서 자주 사용하는 단어들 ###
 - 스친, 스치니 = 쓰레드 친구  
 - 스하리 = 맞팔로우 (ex: "스하리하자!"로 소통 유도)  
@@ -142,4 +146,41 @@ LangGraph처럼 로우 레벨로 AI 에이전트 만드는 거에 관심 있으
 난 뒷삭은 절대 안 해 ♥️  
 #스하리1000명프로젝트
 """
-    return prompt
+
+# 가변 뉴스 블록 템플릿
+NEWS_TEMPLATE = """### {topic}과 관련된 최신 뉴스 ###
+"""
+
+
+@lru_cache(maxsize=128)
+def get_system_prompt(topic: str, persona: str = DEFAULT_PERSONA) -> str:
+    """
+    주제/페르소나별 정적 시스템 프롬프트를 생성하고 캐싱합니다.
+    """
+    return SYSTEM_TEMPLATE.format(topic=topic, persona=persona.format(topic=topic))
+
+
+def get_news_prompt(topic: str, news: str) -> str:
+    """
+    뉴스 블록을 생성합니다. 뉴스 본문은 템플릿 치환 대상이 아니므로
+    스크랩된 뉴스에 {, }가 있어도 안전합니다.
+    """
+    return NEWS_TEMPLATE.format(topic=topic) + news
+
+
+def get_messages(topic: str, news: str, persona: str = DEFAULT_PERSONA) -> list:
+    """
+    (role, content) 형식의 메시지 목록을 반환합니다.
+    정적 시스템 블록을 맨 앞에 두어 호출 간 prefix가 동일하게 유지됩니다.
+    """
+    return [
+        ("system", get_system_prompt(topic, persona)),
+        ("human", get_news_prompt(topic, news)),
+    ]
+
+
+def get_prompt(topic, news):
+    """
+    기존 호환용: 시스템 블록과 뉴스 블록을 하나의 문자열로 합쳐 반환합니다.
+    """
+    return get_system_prompt(topic, DEFAULT_PERSONA) + "\n---\n\n" + get_news_prompt(topic, news)
@@ -0,0 +1,65 @@
+import unicodedata
+from src.validator import MAX_POST_CHARS, count_chars, find_hashtags, fit_post
+
+# 프롬프트에서 요구하는 권장 분량 (줄바꿈 포함 300자)
+TARGET_CHARS = 300
+# 최근 게시물과 이 값 이상 비슷하면 중복으로 간주
+DUPLICATE_THRESHOLD = 0.6
+
+
+def count_emojis(text: str) -> int:
+    return sum(1 for ch in text if unicodedata.category(ch) == "So" or ord(ch) >= 0x1F000)
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    text = "".join(text.split())
+    return {text[i:i + size] for i in range(max(1, len(text) - size + 1))}
+
+
+def similarity(a: str, b: str) -> float:
+    """
+    글자 3-gram 자카드 유사도 (0~1)
+    """
+    sa, sb = _shingles(a), _shingles(b)
+    if not sa or not sb:
+        return 0.0
+    return len(sa & sb) / len(sa | sb)
+
+
+def score_post(text: str, recent_posts: list = ()) -> float:
+    """
+    후보 게시물을 로컬 규칙으로 점수화합니다. 높을수록 좋으며,
+    로컬 보정(fit_post)으로도 업로드할 수 없는 후보는 float("-inf")입니다.
+    - 길이: 권장 분량(300자)에 가까울수록 가점, 500자를 넘어 잘라야 하면 감점
+    - 해시태그: 정확히 1개면 가점
+    - 이모티콘: 1~5개 사용 시 가점
+    - 중복: 최근 게시물과 비슷할수록 감점
+    """
+    if fit_post(text) is None:
+        return float("-inf")
+    length = count_chars(text)
+    score = 1.0 - abs(length - TARGET_CHARS) / MAX_POST_CHARS
+    if length > MAX_POST_CHARS:
+        score -= 1.0
+    hashtags = len(find_hashtags(text))
+    score += 1.0 if hashtags == 1 else -0.5
+    emojis = count_emojis(text)
+    score += 0.5 if 1 <= emojis <= 5 else 0.0
+    if recent_posts:
+        duplicate = max(similarity(text, post) for post in recent_posts)
+        score -= 3.0 if duplicate >= DUPLICATE_THRESHOLD else duplicate
+    return score
+
+
+def pick_best(candidates: list, recent_posts: list = ()) -> tuple:
+    """
+    후보 중 점수가 가장 높은 게시물을 고릅니다.
+    (선택된 게시물 또는 None, 후보별 점수 목록) 튜플을 반환합니다.
+    """
+    scores = [score_post(text, recent_posts) for text in candidates]
+    best = None
+    best_score = float("-inf")
+    for text, score in zip(candidates, scores):
+        if score > best_score:
+            best, best_score = text, score
+    return best, scores
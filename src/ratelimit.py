@@ -0,0 +1,359 @@
+import os
+import json
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future
+from src import storage
+
+# Threads 게시 한도: 계정당 24시간에 250개 (threads_publishing_limit으로 실제 값을 동기화)
+THREADS_PUBLISH_QUOTA = int(os.getenv("THREADS_PUBLISH_QUOTA", "250"))
+THREADS_QUOTA_WINDOW = float(os.getenv("THREADS_QUOTA_WINDOW", str(24 * 60 * 60)))
+# 한 번에 몰아서 보낼 수 있는 게시물 수 (기본 1: 한도 구간(window / quota 간격)에 완전히 균등 분산,
+# 늘리면 그 개수만큼은 간격 없이 바로 게시되고 이후부터 균등 간격이 적용됨.
+# 오래 기다려야 하는 게시물은 bot.PUBLISH_DEFER_SECONDS에 따라 예약 게시 작업으로 넘어가므로 작업 워커를 붙잡지 않음)
+THREADS_PUBLISH_BURST = int(os.getenv("THREADS_PUBLISH_BURST", "1"))
+# 게시 외 Graph API 호출 한도 (계정당 24시간 호출 수, 기본값은 노출 1회 기준 4800)
+THREADS_API_CALLS_PER_DAY = int(os.getenv("THREADS_API_CALLS_PER_DAY", "4800"))
+THREADS_API_BURST = int(os.getenv("THREADS_API_BURST", "250"))
+# 토큰을 이 시간 이상 기다려야 하면 포기하고 오류 반환
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "900"))
+# 계정별 게시 레인의 동시 실행 수
+PUBLISH_LANE_WORKERS = int(os.getenv("PUBLISH_LANE_WORKERS", "2"))
+# 버킷 상태를 SQLite에 두어 같은 호스트의 모든 프로세스(gunicorn 워커, 작업 워커, 샤딩 러너)가 계정별 한도를 함께 씀
+# (false면 프로세스별 메모리. 이 경우 계정마다 게시하는 프로세스가 하나뿐이어야 함)
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", storage.data_path("ratelimit.db"))
+# 사용률(%)이 이 값을 넘으면 속도를 줄이기 시작
+USAGE_SLOWDOWN_THRESHOLD = float(os.getenv("USAGE_SLOWDOWN_THRESHOLD", "75"))
+
+# 호출 한도 초과를 뜻하는 Graph API 오류 코드
+THROTTLE_ERROR_CODES = {4, 17, 32, 613}
+DEFAULT_PENALTY = 60.0
+
+
+class BucketStore:
+    """
+    토큰 버킷 상태(토큰 수, 속도, 차단 시각)를 SQLite에 저장합니다.
+    버킷 연산은 BEGIN IMMEDIATE 트랜잭션 안에서 상태를 읽고 고쳐 쓰므로 여러 프로세스가 같은 버킷을 나눠 씁니다.
+    (TaskLeases와 마찬가지로 한 호스트 안에서만 공유하며, 노드끼리는 계정 단위 샤드로 나뉨)
+    """
+
+    FIELDS = ("tokens", "updated", "rate", "base_rate", "blocked_until")
+
+    def __init__(self, path: str = RATE_LIMIT_DB_PATH):
+        self._conn = storage.connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+            "updated REAL NOT NULL, rate REAL NOT NULL, base_rate REAL NOT NULL, blocked_until REAL NOT NULL)"
+        )
+
+    @contextmanager
+    def transaction(self, key: str, bucket: "TokenBucket"):
+        """
+        저장된 상태를 bucket에 읽어 들이고, 블록이 끝나면 바뀐 상태를 기록합니다.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT {', '.join(self.FIELDS)} FROM rate_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    for field in self.FIELDS:
+                        setattr(bucket, field, row[field])
+                yield
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO rate_buckets (key, {', '.join(self.FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, *(getattr(bucket, field) for field in self.FIELDS)),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store() -> BucketStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BucketStore()
+    return _store
+
+
+class TokenBucket:
+    """
+    토큰 버킷입니다. rate(초당 토큰)로 채워지고 capacity까지 쌓입니다.
+    토큰을 미리 예약(음수 허용)하는 방식이라 대기 중인 호출들이 rate 간격으로 고르게 풀려납니다.
+    penalize()로 일정 시간 차단하거나 속도를 줄이고, 정상 응답이 이어지면 원래 속도로 회복합니다.
+    store가 주어지면 상태를 key로 저장해 다른 프로세스의 같은 버킷과 공유합니다. (시각은 프로세스 간에 같은 time.time 기준)
+    """
+
+    def __init__(self, rate: float, capacity: int, store: BucketStore = None, key: str = None):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.time()
+        self.blocked_until = 0.0
+        self._store = store
+        self._key = key
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _state(self):
+        with self._lock:
+            if self._store is None:
+                yield
+            else:
+                with self._store.transaction(self._key, self):
+                    yield
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, max_wait: float = None):
+        """
+        토큰 하나를 예약하고 기다려야 할 시간(초)을 반환합니다.
+        max_wait보다 오래 기다려야 하면 예약을 취소하고 None을 반환합니다.
+        """
+        with self._state():
+            now = time.time()
+            self._refill(now)
+            self.tokens -= 1
+            wait = max(0.0, -self.tokens / self.rate, self.blocked_until - now)
+            if max_wait is not None and wait > max_wait:
+                self.tokens += 1
+                return None
+            return wait
+
+    def _available_in(self, now: float) -> float:
+        return max(0.0, (1 - self.tokens) / self.rate, self.blocked_until - now)
+
+    def delay(self) -> float:
+        """
+        토큰을 예약하지 않고, 토큰 하나를 바로 쓸 수 있을 때까지 남은 시간(초)을 반환합니다.
+        """
+        with self._state():
+            now = time.time()
+            self._refill(now)
+            return self._available_in(now)
+
+    def try_acquire(self) -> float:
+        """
+        토큰을 바로 쓸 수 있으면 가져가고 0을 반환합니다. 아니면 예약하지 않고 기다려야 할 시간(초)을 반환합니다.
+        (기다리는 동안 스레드를 붙잡으면 안 되는 폴러용)
+        """
+        with self._state():
+            now = time.time()
+            self._refill(now)
+            wait = self._available_in(now)
+            if wait == 0:
+                self.tokens -= 1
+            return wait
+
+    def acquire(self, max_wait: float = RATE_LIMIT_MAX_WAIT) -> bool:
+        wait = self.reserve(max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def penalize(self, seconds: float):
+        with self._state():
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+            self.rate = max(self.base_rate * 0.05, self.rate * 0.5)
+
+    def recover(self):
+        with self._state():
+            self.rate = min(self.base_rate, self.rate * 1.2)
+
+    def apply_usage(self, percent: float):
+        """
+        서버가 알려준 사용률(%)에 맞춰 속도를 줄입니다. 100%에 가까울수록 느려집니다.
+        """
+        if percent < USAGE_SLOWDOWN_THRESHOLD:
+            return
+        with self._state():
+            headroom = max(0.05, (100 - percent) / (100 - USAGE_SLOWDOWN_THRESHOLD))
+            self.rate = min(self.rate, self.base_rate * headroom)
+
+    def set_quota(self, total: int, window: float, used: int = 0):
+        """
+        실제 한도 정보로 버킷을 다시 맞춥니다. 남은 한도보다 많은 토큰은 쓰지 않습니다.
+        """
+        with self._state():
+            self._refill(time.time())
+            self.base_rate = total / window
+            self.rate = min(self.rate, self.base_rate)
+            self.tokens = min(self.tokens, max(0, total - used))
+
+    def snapshot(self) -> dict:
+        with self._state():
+            self._refill(time.time())
+            return {
+                "tokens": round(self.tokens, 2),
+                "rate_per_hour": round(self.rate * 3600, 2),
+                "base_rate_per_hour": round(self.base_rate * 3600, 2),
+                "blocked_for": round(max(0.0, self.blocked_until - time.time()), 1),
+            }
+
+
+# 엔드포인트별 (초당 토큰, 버스트) 기본값
+ENDPOINT_LIMITS = {
+    "threads": (THREADS_API_CALLS_PER_DAY / (24 * 60 * 60), THREADS_API_BURST),
+    "threads_publish": (THREADS_PUBLISH_QUOTA / THREADS_QUOTA_WINDOW, THREADS_PUBLISH_BURST),
+}
+DEFAULT_LIMIT = ENDPOINT_LIMITS["threads"]
+
+
+def _usage_percent(headers) -> tuple:
+    """
+    X-App-Usage / X-Business-Use-Case-Usage 헤더에서 가장 높은 사용률(%)과
+    접근 회복까지 남은 시간(초)을 뽑습니다.
+    """
+    percent = 0.0
+    regain = 0.0
+    for name in ("X-App-Usage", "X-Business-Use-Case-Usage"):
+        raw = headers.get(name)
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            continue
+        entries = [data] if name == "X-App-Usage" else [e for values in data.values() for e in values]
+        for entry in entries:
+            for key in ("call_count", "total_time", "total_cputime"):
+                percent = max(percent, float(entry.get(key) or 0))
+            regain = max(regain, float(entry.get("estimated_time_to_regain_access") or 0) * 60)
+    return percent, regain
+
+
+class RateLimiter:
+    """
+    (계정, 엔드포인트)별 토큰 버킷 모음입니다.
+    응답 헤더의 사용률과 429/한도 초과 오류 코드를 보고 버킷 속도를 조정합니다.
+    RATE_LIMIT_SHARED가 켜져 있으면 버킷 상태를 SQLite(BucketStore)에 두므로, 프로세스가 여러 개여도
+    계정별 한도와 게시 간격이 프로세스 수만큼 늘어나지 않습니다.
+    """
+
+    def __init__(self, store: BucketStore = None, shared: bool = RATE_LIMIT_SHARED):
+        self._store = store
+        self._shared = shared or store is not None
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, account: str, endpoint: str) -> TokenBucket:
+        key = (account, endpoint)
+        with self._lock:
+            if key not in self._buckets:
+                rate, capacity = ENDPOINT_LIMITS.get(endpoint, DEFAULT_LIMIT)
+                # 임포트 시점에 DB를 열지 않도록 첫 버킷을 만들 때 저장소를 엶
+                if self._shared and self._store is None:
+                    self._store = get_bucket_store()
+                self._buckets[key] = TokenBucket(rate, capacity, self._store, f"{account}/{endpoint}")
+            return self._buckets[key]
+
+    def acquire(self, account: str, endpoint: str, max_wait: float = RATE_LIMIT_MAX_WAIT) -> bool:
+        return self.bucket(account, endpoint).acquire(max_wait)
+
+    def try_acquire(self, account: str, endpoint: str) -> float:
+        return self.bucket(account, endpoint).try_acquire()
+
+    def reserve(self, account: str, endpoint: str, max_wait: float = RATE_LIMIT_MAX_WAIT):
+        return self.bucket(account, endpoint).reserve(max_wait)
+
+    def delay(self, account: str, endpoint: str) -> float:
+        return self.bucket(account, endpoint).delay()
+
+    def observe(self, account: str, endpoint: str, response) -> bool:
+        """
+        응답을 반영하여 버킷을 조정합니다. 호출 한도에 걸린 응답이면 True를 반환합니다.
+        """
+        bucket = self.bucket(account, endpoint)
+        percent, regain = _usage_percent(response.headers)
+        bucket.apply_usage(percent)
+
+        code = None
+        if response.status_code >= 400:
+            try:
+                code = (response.json().get("error") or {}).get("code")
+            except ValueError:
+                code = None
+        if response.status_code == 429 or code in THROTTLE_ERROR_CODES:
+            retry_after = response.headers.get("Retry-After")
+            penalty = float(retry_after) if retry_after and retry_after.isdigit() else max(regain, DEFAULT_PENALTY)
+            bucket.penalize(penalty)
+            print(f"[-] Threads 호출 한도 초과 ({account}/{endpoint}), {penalty:.0f}초 대기")
+            return True
+        if regain:
+            bucket.penalize(regain)
+        elif response.status_code < 400:
+            bucket.recover()
+        return False
+
+    def set_quota(self, account: str, endpoint: str, total: int, window: float, used: int = 0):
+        self.bucket(account, endpoint).set_quota(total, window, used)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {f"{account}/{endpoint}": bucket.snapshot() for (account, endpoint), bucket in buckets.items()}
+
+
+class PublishScheduler:
+    """
+    계정별 게시 대기열입니다. 계정마다 하나의 레인(PUBLISH_LANE_WORKERS개 스레드)이 대기열을 순서대로 비우며,
+    실제 간격은 RateLimiter의 게시 버킷이 한도 구간(window / quota)에 맞춰 균등하게 벌립니다.
+    한 계정의 대기가 다른 계정의 게시를 막지 않습니다.
+    """
+
+    def __init__(self, workers: int = PUBLISH_LANE_WORKERS):
+        self.workers = workers
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    def _lane(self, account: str) -> queue.Queue:
+        with self._lock:
+            if account not in self._lanes:
+                lane = queue.Queue()
+                for index in range(self.workers):
+                    thread = threading.Thread(target=self._drain, args=(lane,), name=f"publish-{account}-{index}",
+                                              daemon=True)
+                    thread.start()
+                self._lanes[account] = lane
+            return self._lanes[account]
+
+    @staticmethod
+    def _drain(lane: queue.Queue):
+        while True:
+            future, fn, args, kwargs = lane.get()
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+            lane.task_done()
+
+    def submit(self, account: str, fn, *args, **kwargs) -> Future:
+        future = Future()
+        self._lane(account).put((future, fn, args, kwargs))
+        return future
+
+    def pending(self) -> dict:
+        with self._lock:
+            return {account: lane.qsize() for account, lane in self._lanes.items()}
+
+
+limiter = RateLimiter()
+publish_scheduler = PublishScheduler()
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from src import storage
+
+# 검색 결과 캐시 설정
+SEARCH_CACHE_BACKEND = os.getenv("SEARCH_CACHE_BACKEND", "memory")  # memory | sqlite | none
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", storage.data_path("search_cache.db"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "512"))
+# 지정하면 freshness window 대신 이 값(초)을 TTL로 사용
+SEARCH_CACHE_TTL = os.getenv("SEARCH_CACHE_TTL")
+
+# Serper tbs(검색 기간) 값별 TTL: 검색 기간이 바뀌기 전까지는 같은 결과를 재사용
+FRESHNESS_TTL = {
+    "qdr:h": 60 * 60,
+    "qdr:d": 24 * 60 * 60,
+    "qdr:w": 7 * 24 * 60 * 60,
+    "qdr:m": 30 * 24 * 60 * 60,
+    "qdr:y": 365 * 24 * 60 * 60,
+}
+DEFAULT_TTL = 60 * 60
+
+
+def ttl_for(tbs: str) -> int:
+    if SEARCH_CACHE_TTL:
+        return int(SEARCH_CACHE_TTL)
+    return FRESHNESS_TTL.get(tbs, DEFAULT_TTL)
+
+
+def make_key(query: str, search_type: str, tbs: str, k: int) -> str:
+    return json.dumps([query.strip().lower(), search_type, tbs, k], ensure_ascii=False)
+
+
+class MemoryCache:
+    """
+    프로세스 내 LRU + TTL 캐시입니다.
+    """
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._data[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key: str, value, ttl: int):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+
+class SQLiteCache:
+    """
+    SQLite 디스크 캐시입니다. 프로세스 재시작이나 여러 워커 간에도 결과를 공유합니다.
+    값은 JSON으로 저장하며, 최대 개수를 넘으면 가장 오래 접근하지 않은 항목부터 지웁니다.
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._conn = storage.connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache(accessed_at)")
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            if row["expires_at"] < now:
+                self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+            return json.loads(row["value"])
+
+    def set(self, key: str, value, ttl: int):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + ttl, now),
+            )
+            self._conn.execute("DELETE FROM search_cache WHERE expires_at < ?", (now,))
+            count = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM search_cache WHERE key IN "
+                    "(SELECT key FROM search_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.stats["evictions"] += overflow
+
+
+class NullCache:
+    """
+    캐시를 사용하지 않을 때의 백엔드입니다.
+    """
+
+    def __init__(self):
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key: str):
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, value, ttl: int):
+        pass
+
+
+BACKENDS = {"memory": MemoryCache, "sqlite": SQLiteCache, "none": NullCache}
+
+_cache = None
+_cache_lock = threading.Lock()
+_key_locks = {}
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = BACKENDS[SEARCH_CACHE_BACKEND]()
+    return _cache
+
+
+def set_cache(cache):
+    """
+    캐시 백엔드를 교체합니다. (get/set/stats를 가진 객체면 무엇이든 가능)
+    """
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def cached_search(query: str, search_type: str, tbs: str, k: int, fetch):
+    """
+    (query, type, tbs, k) 키로 캐시를 조회하고, 없으면 fetch()를 호출해 결과를 저장합니다.
+    같은 키를 동시에 요청하면 첫 번째 요청만 API를 호출하고 나머지는 그 결과를 기다립니다.
+    (키별 잠금 객체는 키 개수만큼만 유지되므로 따로 정리하지 않습니다.)
+    fetch()가 None을 반환하면 저장하지 않습니다.
+    """
+    cache = get_cache()
+    key = make_key(query, search_type, tbs, k)
+    with _cache_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        value = cache.get(key)
+        if value is None:
+            value = fetch()
+            if value is not None:
+                cache.set(key, value, ttl_for(tbs))
+    return value
+
+
+def cache_stats() -> dict:
+    return dict(get_cache().stats)
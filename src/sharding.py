@@ -0,0 +1,271 @@
+"""
+(계정, 주제) 작업을 여러 프로세스/노드에 나눠 실행하는 샤딩 러너입니다.
+
+    python -m src.sharding --processes 4                          # 이 노드에서 프로세스 4개로 나눠 생성
+    SHARD_INDEX=1 SHARD_COUNT=3 python -m src.sharding             # 노드 3대 중 두 번째 노드의 몫만 실행
+    python -m src.sharding --produce --processes 4                 # 게시물 버퍼 채우기를 나눠 실행
+
+작업은 일관된 해싱(consistent hashing)으로 샤드에 배정되므로 샤드 수가 바뀌어도 대부분의 작업은 같은 샤드에 남습니다.
+노드는 계정 단위로 나누므로 한 계정의 호출 한도 버킷과 게시 스케줄러는 항상 한 노드에만 있고,
+노드 안의 자식 프로세스는 (계정, 주제) 단위로 나눠 생성(검색/LLM)만 하며 게시는 부모 프로세스가 모아서 합니다.
+"""
+import os
+import sys
+import time
+import json
+import bisect
+import socket
+import hashlib
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from src import storage
+
+# 노드 단위 샤딩: SHARD_COUNT대의 노드(또는 독립 워커) 중 이 노드의 번호
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+# 노드 안에서 작업을 나눠 실행할 프로세스 수 (1이면 현재 프로세스에서 스레드로만 실행)
+TOPIC_PROCESSES = int(os.getenv("TOPIC_PROCESSES", "1"))
+# 해시 링에서 샤드 하나가 차지하는 가상 노드 수 (많을수록 고르게 분산)
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", "128"))
+# 같은 작업을 한 노드 안에서 동시에 두 번 실행하지 않도록 잡는 리스
+# (SQLite WAL은 네트워크 파일시스템에서 잠금이 보장되지 않으므로 LEASE_DB_PATH는 로컬 디스크에 두어야 함)
+TOPIC_LOCKS = os.getenv("TOPIC_LOCKS", "true").lower() in ("1", "true", "yes")
+LEASE_DB_PATH = os.getenv("LEASE_DB_PATH", storage.data_path("leases.db"))
+# 워커가 죽어 리스가 풀리지 않아도 이 시간이 지나면 다른 워커가 가져갈 수 있음
+# (실행 중인 작업의 리스는 백그라운드 스레드가 TTL의 1/3마다 연장하므로 작업 시간보다 짧아도 됨)
+TOPIC_LEASE_SECONDS = float(os.getenv("TOPIC_LEASE_SECONDS", "300"))
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+def task_key(task: tuple) -> str:
+    user_id, topic = task
+    return f"{user_id}/{topic}"
+
+
+def account_key(task: tuple) -> str:
+    return str(task[0])
+
+
+class HashRing:
+    """
+    샤드 번호를 가상 노드로 해시 링에 올려 두고, 키를 시계 방향으로 가장 가까운 샤드에 배정합니다.
+    salt가 다른 링은 서로 독립적으로 나뉘므로, 노드 샤드 안을 다시 프로세스 샤드로 나눌 때 한쪽으로 쏠리지 않습니다.
+    """
+
+    def __init__(self, count: int, vnodes: int = SHARD_VNODES, salt: str = "node"):
+        self.count = count
+        points = sorted((_hash(f"{salt}:shard-{shard}#{vnode}"), shard)
+                        for shard in range(count) for vnode in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        if self.count <= 1:
+            return 0
+        position = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._shards[position]
+
+
+def shard_tasks(tasks: list, index: int = None, count: int = None, salt: str = "node", key=account_key) -> list:
+    """
+    count개 샤드 중 index번 샤드에 배정된 작업만 남깁니다.
+    기본값은 계정 단위로 나누므로, 같은 계정의 작업은 모두 같은 샤드(노드)에 배정됩니다.
+    """
+    index = SHARD_INDEX if index is None else index
+    count = SHARD_COUNT if count is None else count
+    if count <= 1:
+        return list(tasks)
+    if not 0 <= index < count:
+        raise ValueError(f"shard index {index} out of range for {count} shards")
+    ring = HashRing(count, salt=salt)
+    return [task for task in tasks if ring.shard_for(key(task)) == index]
+
+
+def lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class TaskLeases:
+    """
+    작업 키별 리스를 SQLite에 기록합니다. acquire는 BEGIN IMMEDIATE 트랜잭션 안에서
+    비어 있거나 만료된 리스만 가져가므로 같은 호스트의 여러 프로세스가 같은 작업을 동시에 실행하지 않습니다.
+    노드 사이의 조율에는 쓰지 않습니다. 노드끼리는 계정 단위 샤드가 겹치지 않는 것으로 나뉩니다.
+    잡고 있는 리스는 release될 때까지 백그라운드 스레드가 연장하므로, 작업이 TTL보다 오래 걸려도
+    (호출 한도 대기 + 컨테이너 폴링 + 게시 슬롯 대기) 다른 워커가 가져가지 않습니다.
+    """
+
+    def __init__(self, path: str = LEASE_DB_PATH):
+        self._conn = storage.connect(path)
+        self._lock = threading.Lock()
+        # 연장할 리스: key -> (owner, ttl)
+        self._held = {}
+        self._renewer = None
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS task_leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, "
+            "acquired_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def acquire(self, key: str, owner: str, ttl: float = TOPIC_LEASE_SECONDS) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT owner, expires_at FROM task_leases WHERE key = ?", (key,)).fetchone()
+                acquired = row is None or row["expires_at"] <= now or row["owner"] == owner
+                if acquired:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO task_leases (key, owner, acquired_at, expires_at) VALUES (?, ?, ?, ?)",
+                        (key, owner, now, now + ttl),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if acquired:
+                self._held[key] = (owner, ttl)
+                self._start_renewer()
+        return acquired
+
+    def release(self, key: str, owner: str):
+        with self._lock:
+            if self._held.get(key, (None,))[0] == owner:
+                del self._held[key]
+            self._conn.execute("DELETE FROM task_leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def renew(self) -> list:
+        """
+        잡고 있는 리스의 만료 시각을 늘립니다. 그사이 만료되어 다른 워커가 가져간 리스는
+        더 이상 연장하지 않고 그 키 목록을 반환합니다.
+        """
+        lost = []
+        with self._lock:
+            now = time.time()
+            for key, (owner, ttl) in list(self._held.items()):
+                cursor = self._conn.execute(
+                    "UPDATE task_leases SET expires_at = ? WHERE key = ? AND owner = ?", (now + ttl, key, owner)
+                )
+                if cursor.rowcount == 0:
+                    del self._held[key]
+                    lost.append(key)
+        for key in lost:
+            print(f"[-] 작업 리스를 잃었습니다: {key}")
+        return lost
+
+    def _start_renewer(self):
+        # 호출한 쪽이 self._lock을 잡고 있음
+        if self._renewer is None or not self._renewer.is_alive():
+            self._renewer = threading.Thread(target=self._renew_loop, name="lease-renewer", daemon=True)
+            self._renewer.start()
+
+    def _renew_loop(self):
+        while True:
+            with self._lock:
+                if not self._held:
+                    self._renewer = None
+                    return
+                interval = min(ttl for _, ttl in self._held.values()) / 3
+            time.sleep(interval)
+            try:
+                self.renew()
+            except Exception as e:
+                print("[-] 작업 리스 연장 실패:", e)
+
+    def active(self) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, owner, acquired_at, expires_at FROM task_leases WHERE expires_at > ? ORDER BY key",
+                (time.time(),),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def acquire_task(kind: str, task: tuple, owner: str) -> bool:
+    return get_leases().acquire(f"{kind}:{task_key(task)}", owner)
+
+
+def release_task(kind: str, task: tuple, owner: str):
+    get_leases().release(f"{kind}:{task_key(task)}", owner)
+
+
+_leases = None
+_leases_lock = threading.Lock()
+
+
+def get_leases() -> TaskLeases:
+    global _leases
+    if _leases is None:
+        with _leases_lock:
+            if _leases is None:
+                _leases = TaskLeases()
+    return _leases
+
+
+def _run_shard(kind: str, tasks: list, index: int, count: int) -> list:
+    """
+    자식 프로세스에서 실행됩니다. 자신의 샤드에 배정된 작업만 bot에서 처리합니다.
+    Threads API를 호출하지 않는 단계(생성, 게시물 버퍼 채우기)만 실행하므로 호출 한도가 프로세스 수만큼 늘지 않습니다.
+    """
+    from src import bot
+
+    tasks = shard_tasks(tasks, index, count, salt="process", key=task_key)
+    if not tasks:
+        return []
+    print(f"[+] 샤드 {index}/{count} (pid {os.getpid()}): 작업 {len(tasks)}개")
+    if kind == "produce":
+        return bot.produce(tasks=tasks)
+    return bot.generate_tasks(tasks)
+
+
+def run_sharded(kind: str, tasks: list, processes: int = None) -> list:
+    """
+    작업을 processes개 샤드로 나눠 프로세스 풀에서 실행하고 결과를 원래 작업 순서대로 모읍니다.
+    kind는 "generate"(게시물 생성, 게시는 호출한 프로세스가 수행) 또는 "produce"(게시물 버퍼 채우기)입니다.
+    자식 프로세스는 spawn으로 시작하므로 부모의 스레드/연결 상태를 물려받지 않습니다.
+    """
+    processes = max(1, min(processes or TOPIC_PROCESSES, len(tasks) or 1))
+    if processes == 1 or not tasks:
+        results = _run_shard(kind, tasks, 0, 1) if tasks else []
+        by_task = {(result.get("account"), result.get("topic")): result for result in results}
+        return [by_task.get(task, {"topic": task[1], "account": task[0], "error": "Missing shard result"})
+                for task in tasks]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        futures = [pool.submit(_run_shard, kind, tasks, index, processes) for index in range(processes)]
+        by_task = {}
+        for future in futures:
+            for result in future.result():
+                by_task[(result.get("account"), result.get("topic"))] = result
+    return [by_task.get(task, {"topic": task[1], "account": task[0], "error": "Missing shard result"})
+            for task in tasks]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Topic-sharded bot runner")
+    parser.add_argument("--topic", action="append", help="topic to run (repeatable, default: topic registry)")
+    parser.add_argument("--account", action="append", help="account to post as (repeatable)")
+    parser.add_argument("--processes", type=int, default=TOPIC_PROCESSES)
+    parser.add_argument("--shard-index", type=int, default=SHARD_INDEX)
+    parser.add_argument("--shard-count", type=int, default=SHARD_COUNT)
+    parser.add_argument("--produce", action="store_true", help="fill the post buffer instead of publishing")
+    parser.add_argument("--live", action="store_true", help="generate and publish without the post buffer")
+    args = parser.parse_args(argv)
+
+    from src import bot
+
+    tasks = shard_tasks(bot.plan_tasks(args.topic, args.account, shard=False), args.shard_index, args.shard_count)
+    print(f"[+] 노드 샤드 {args.shard_index}/{args.shard_count}: 작업 {len(tasks)}개, 프로세스 {args.processes}개")
+    if args.produce:
+        results = run_sharded("produce", tasks, args.processes)
+    else:
+        results = bot.publish_sharded(tasks, args.processes, buffered=bot.POST_BUFFER and not args.live)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
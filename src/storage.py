@@ -0,0 +1,33 @@
+import os
+import sqlite3
+
+# 로컬 데이터 파일(SQLite)을 저장할 기본 디렉터리
+DATA_DIR = os.getenv("DATA_DIR", "data")
+
+
+def data_path(filename: str) -> str:
+    return os.path.join(DATA_DIR, filename)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    SQLite 연결을 엽니다. 여러 스레드/프로세스가 같은 파일을 함께 쓰므로
+    WAL 모드와 busy timeout을 설정합니다.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def add_column(conn: sqlite3.Connection, table: str, column: str, declaration: str):
+    """
+    이전 버전에서 만든 테이블에 없는 컬럼을 추가합니다.
+    """
+    columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
@@ -0,0 +1,173 @@
+import os
+import time
+import threading
+from src import storage, http_client
+
+# 토큰 저장소 설정
+TOKEN_DB_PATH = os.getenv("TOKEN_DB_PATH", storage.data_path("tokens.db"))
+TOKEN_REFRESH_URL = os.getenv("TOKEN_REFRESH_URL", "https://graph.threads.net/refresh_access_token")
+# 만료까지 남은 시간이 이 값보다 짧으면 갱신 (장기 토큰 유효기간은 60일)
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", str(7 * 24 * 60 * 60)))
+# 백그라운드 갱신 스레드가 만료 임박 토큰을 확인하는 간격 (초)
+TOKEN_REFRESH_INTERVAL = float(os.getenv("TOKEN_REFRESH_INTERVAL", str(60 * 60)))
+# 발급/갱신 후 이 시간이 지나야 갱신 가능 (Threads 장기 토큰 제약)
+TOKEN_MIN_AGE = 24 * 60 * 60
+
+
+def _row_to_account(row, include_token: bool = False) -> dict:
+    account = {
+        "user_id": row["user_id"],
+        "username": row["username"],
+        "expires_at": row["expires_at"],
+        "refreshed_at": row["refreshed_at"],
+        "last_error": row["last_error"],
+    }
+    if include_token:
+        account["access_token"] = row["access_token"]
+    return account
+
+
+class TokenStore:
+    """
+    계정(Threads 사용자 ID)별 장기 액세스 토큰을 SQLite에 저장합니다.
+    봇은 게시할 때마다 이 저장소에서 토큰을 읽으므로, /callback으로 새로 받은 토큰이나
+    백그라운드에서 갱신된 토큰이 재시작 없이 바로 반영됩니다.
+    """
+
+    def __init__(self, path: str = TOKEN_DB_PATH):
+        self._conn = storage.connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS accounts ("
+            "user_id TEXT PRIMARY KEY, username TEXT, access_token TEXT NOT NULL, expires_at REAL, "
+            "refreshed_at REAL NOT NULL, last_error TEXT, created_at REAL NOT NULL)"
+        )
+
+    def save(self, user_id: str, access_token: str, expires_in: float = None, username: str = None,
+             issued_at: float = None):
+        """
+        토큰을 저장합니다. expires_in을 모르면 만료 시각 없이 저장하고 첫 갱신 때 채웁니다.
+        """
+        now = time.time()
+        issued_at = issued_at or now
+        expires_at = issued_at + float(expires_in) if expires_in else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO accounts (user_id, username, access_token, expires_at, refreshed_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(user_id) DO UPDATE SET "
+                "username = COALESCE(excluded.username, accounts.username), access_token = excluded.access_token, "
+                "expires_at = excluded.expires_at, refreshed_at = excluded.refreshed_at, last_error = NULL",
+                (str(user_id), username, access_token, expires_at, issued_at, now),
+            )
+
+    def get(self, user_id: str) -> str:
+        """
+        만료되지 않은 토큰을 반환하고, 없거나 만료되었으면 None을 반환합니다.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT access_token, expires_at FROM accounts WHERE user_id = ?", (str(user_id),)
+            ).fetchone()
+        if row is None or (row["expires_at"] is not None and row["expires_at"] <= time.time()):
+            return None
+        return row["access_token"]
+
+    def accounts(self, include_expired: bool = False) -> list:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM accounts ORDER BY created_at").fetchall()
+        now = time.time()
+        return [_row_to_account(row) for row in rows
+                if include_expired or row["expires_at"] is None or row["expires_at"] > now]
+
+    def remove(self, user_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM accounts WHERE user_id = ?", (str(user_id),))
+
+    def due_for_refresh(self, margin: float = TOKEN_REFRESH_MARGIN) -> list:
+        """
+        만료가 margin 안으로 다가왔거나 만료 시각을 모르는 토큰 중, 갱신 가능한(발급 후 24시간 지난) 계정 목록입니다.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM accounts WHERE (expires_at IS NULL OR expires_at - ? < ?) "
+                "AND (expires_at IS NULL OR expires_at > ?) AND refreshed_at <= ?",
+                (now, margin, now, now - TOKEN_MIN_AGE),
+            ).fetchall()
+        return [_row_to_account(row, include_token=True) for row in rows]
+
+    def refresh(self, user_id: str, access_token: str) -> bool:
+        """
+        th_refresh_token으로 장기 토큰을 갱신해 저장합니다. 실패하면 오류를 기록하고 False를 반환합니다.
+        """
+        try:
+            response = http_client.get(TOKEN_REFRESH_URL, params={"grant_type": "th_refresh_token",
+                                                                  "access_token": access_token})
+            data = response.json()
+        except Exception as e:
+            data = {"error": str(e)}
+            response = None
+        if response is not None and response.status_code == 200 and data.get("access_token"):
+            self.save(user_id, data["access_token"], data.get("expires_in"))
+            print(f"[+] 액세스 토큰 갱신 완료 ({user_id})")
+            return True
+        with self._lock:
+            self._conn.execute("UPDATE accounts SET last_error = ? WHERE user_id = ?",
+                               (str(data.get("error") or data)[:500], str(user_id)))
+        print(f"[-] 액세스 토큰 갱신 실패 ({user_id}):", data.get("error") or data)
+        return False
+
+    def refresh_due(self, margin: float = TOKEN_REFRESH_MARGIN) -> dict:
+        return {account["user_id"]: self.refresh(account["user_id"], account["access_token"])
+                for account in self.due_for_refresh(margin)}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_token_store() -> TokenStore:
+    """
+    저장소를 한 번만 생성합니다. 환경 변수 USER_ID/ACCESS_TOKEN이 있고 아직 저장되지 않은 계정이면
+    기존 단일 계정 설정과 호환되도록 저장소에 등록합니다.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = TokenStore()
+                user_id, access_token = os.getenv("USER_ID"), os.getenv("ACCESS_TOKEN")
+                if user_id and access_token and store.get(user_id) is None:
+                    store.save(user_id, access_token)
+                _store = store
+    return _store
+
+
+_refresher = None
+_refresher_stop = threading.Event()
+
+
+def start_refresher(interval: float = TOKEN_REFRESH_INTERVAL) -> threading.Thread:
+    """
+    만료가 가까운 토큰을 주기적으로 갱신하는 백그라운드 스레드를 시작합니다.
+    """
+    global _refresher
+    if _refresher is not None and _refresher.is_alive():
+        return _refresher
+    _refresher_stop.clear()
+
+    def loop():
+        while not _refresher_stop.is_set():
+            try:
+                get_token_store().refresh_due()
+            except Exception as e:
+                print("[-] 토큰 갱신 스레드 오류:", e)
+            _refresher_stop.wait(interval)
+
+    _refresher = threading.Thread(target=loop, name="token-refresher", daemon=True)
+    _refresher.start()
+    return _refresher
+
+
+def stop_refresher():
+    _refresher_stop.set()
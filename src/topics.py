@@ -0,0 +1,69 @@
+import os
+import json
+import threading
+
+# 주제 목록 파일 (없으면 DEFAULT_TOPICS 사용)
+TOPICS_FILE = os.getenv("TOPICS_FILE", "topics.json")
+DEFAULT_TOPICS = ["AI Trend"]  # 영어 주제로 설정하여 글로벌 뉴스를 수집
+
+
+def _normalize(entry) -> dict:
+    """
+    "주제" 문자열이나 {"topic": ..., "accounts": [...], "enabled": true} 객체를 같은 형태로 맞춥니다.
+    accounts가 없으면 토큰 저장소에 등록된 모든 계정에 게시합니다.
+    """
+    if isinstance(entry, str):
+        entry = {"topic": entry}
+    return {"topic": entry["topic"], "accounts": entry.get("accounts"), "enabled": entry.get("enabled", True)}
+
+
+class TopicRegistry:
+    """
+    주제 목록 파일을 읽어 두고, 파일이 바뀌면(mtime 기준) 다시 읽는 레지스트리입니다.
+    서버를 재시작하지 않고 topics.json만 고쳐도 다음 실행부터 반영됩니다.
+    """
+
+    def __init__(self, path: str = TOPICS_FILE):
+        self.path = path
+        self._mtime = None
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> list:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return [_normalize(topic) for topic in DEFAULT_TOPICS]
+        with self._lock:
+            if self._entries is None or mtime != self._mtime:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self._entries = [_normalize(entry) for entry in data.get("topics", []) if entry] \
+                    if isinstance(data, dict) else [_normalize(entry) for entry in data if entry]
+                self._mtime = mtime
+            return self._entries
+
+    def entries(self) -> list:
+        return [entry for entry in self._load() if entry["enabled"]]
+
+    def topics(self) -> list:
+        return [entry["topic"] for entry in self.entries()]
+
+    def tasks(self, topics: list = None, accounts: list = None, default_accounts: list = None) -> list:
+        """
+        (계정, 주제) 작업 목록을 만듭니다.
+        topics를 넘기면 레지스트리 대신 그 주제를 쓰고, accounts를 넘기면 주제별 계정 설정보다 우선합니다.
+        """
+        entries = self.entries() if topics is None else [_normalize(topic) for topic in topics]
+        tasks = []
+        for entry in entries:
+            for user_id in accounts or entry["accounts"] or default_accounts or [None]:
+                tasks.append((user_id, entry["topic"]))
+        return list(dict.fromkeys(tasks))
+
+
+registry = TopicRegistry()
+
+
+def load_topics() -> list:
+    return registry.topics()
@@ -0,0 +1,156 @@
+import os
+import re
+import unicodedata
+
+# Threads 게시물 제한
+MAX_POST_CHARS = int(os.getenv("MAX_POST_CHARS", "500"))
+MAX_HASHTAGS = 1
+# 제한을 이 비율 이내로 초과한 경우에만 LLM 재호출 없이 로컬에서 줄임
+SHORTEN_SLACK = float(os.getenv("SHORTEN_SLACK", "0.3"))
+
+HASHTAG_RE = re.compile(r"(?<![\w#])#([^\s#.,!?~]+)")
+ELLIPSIS = "…"
+
+
+def normalize_post(text: str) -> str:
+    """
+    줄바꿈(\r\n, \r)을 \n으로 통일하고 NFC로 정규화합니다.
+    한글 자모처럼 조합 문자로 들어온 글자는 완성형 한 글자로 합쳐집니다.
+    """
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return unicodedata.normalize("NFC", text).strip()
+
+
+def _units(char: str) -> int:
+    # 기본 다국어 평면 밖의 문자(대부분의 이모지)는 UTF-16 서러게이트 쌍이라 2자
+    return 2 if ord(char) > 0xFFFF else 1
+
+
+def count_chars(text: str) -> int:
+    """
+    Threads 기준 글자 수를 셉니다.
+    NFC 정규화 후 UTF-16 코드 단위로 세며, 줄바꿈도 1자로 계산합니다.
+    🤣🔥 같은 이모지는 코드 포인트 1개지만 2자로, ZWJ 결합/변형 선택자도 각각 따로 세므로
+    서버보다 적게 세지 않습니다.
+    """
+    return sum(_units(char) for char in normalize_post(text))
+
+
+def _prefix(text: str, size: int) -> str:
+    """
+    count_chars 기준 size자 이하인 가장 긴 앞부분을 반환합니다.
+    """
+    used = 0
+    for index, char in enumerate(text):
+        used += _units(char)
+        if used > size:
+            return text[:index]
+    return text
+
+
+def find_hashtags(text: str) -> list:
+    return HASHTAG_RE.findall(text)
+
+
+def validate_post(text: str, limit: int = MAX_POST_CHARS) -> dict:
+    """
+    게시물이 업로드 가능한지 로컬에서 검사합니다.
+    """
+    length = count_chars(text)
+    hashtags = find_hashtags(text)
+    errors = []
+    if not length:
+        errors.append("empty")
+    if length > limit:
+        errors.append("too_long")
+    if len(hashtags) > MAX_HASHTAGS:
+        errors.append("too_many_hashtags")
+    return {"ok": not errors, "length": length, "hashtags": hashtags, "errors": errors}
+
+
+def _limit_hashtags(text: str) -> str:
+    """
+    첫 번째 해시태그만 남기고 나머지는 # 기호를 떼어 일반 단어로 바꿉니다.
+    """
+    seen = []
+
+    def replace(match):
+        seen.append(match.group(1))
+        return match.group(0) if len(seen) <= MAX_HASHTAGS else match.group(1)
+
+    return HASHTAG_RE.sub(replace, text)
+
+
+def _truncate(text: str, size: int) -> str:
+    if count_chars(text) <= size:
+        return text
+    cut = _prefix(text, max(0, size - 1)).rstrip()
+    # 가능하면 문장/단어 경계에서 자름
+    for sep in (". ", "! ", "? ", "\n", " "):
+        pos = cut.rfind(sep)
+        if pos >= size // 2:
+            cut = cut[:pos + 1].rstrip()
+            break
+    return cut + ELLIPSIS
+
+
+def fit_post(text: str, limit: int = MAX_POST_CHARS, slack: float = SHORTEN_SLACK):
+    """
+    게시물을 검증하고, 제한을 조금 넘는 경우 LLM 호출 없이 결정적으로 줄입니다.
+    - 해시태그는 첫 번째 것만 유지
+    - 연속된 빈 줄 정리
+    - 첫 줄(인사)과 마지막 줄(콜 투 액션/해시태그)은 남기고 중간 줄을 뒤에서부터 제거
+      (지운 줄에 해시태그가 있었으면 끝에 다시 붙임)
+    - 그래도 넘치면 중간 본문을 문장 경계에서 자름 (해시태그는 제자리에 두고, 잘려 나간 경우에만 끝에 다시 붙임)
+    제한을 slack 비율 이상 초과하면 None을 반환하여 재생성이 필요함을 알립니다.
+    """
+    text = _limit_hashtags(normalize_post(text))
+    if not text:
+        return None
+    if count_chars(text) <= limit:
+        return text
+    if count_chars(text) > limit * (1 + slack):
+        return None
+
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    lines = text.split("\n")
+    if len(lines) >= 3:
+        hashtags = find_hashtags(text)
+
+        def join(parts):
+            # 해시태그가 있던 중간 줄이 지워지거나 잘렸으면 마지막 줄 뒤에 다시 붙임
+            joined = "\n".join(parts)
+            if hashtags and hashtags[0] not in find_hashtags(joined):
+                joined += f"\n#{hashtags[0]}"
+            return joined
+
+        head, middle, tail = lines[:1], lines[1:-1], lines[-1:]
+        while middle and count_chars(join(head + middle + tail)) > limit:
+            middle.pop()
+        if middle:
+            return join(head + middle + tail)
+        # 중간을 모두 지워야 하는 경우엔 정보가 사라지므로 본문을 잘라서 유지
+        middle = lines[1:-1]
+        budget = limit - count_chars(join(head + tail)) - 2
+        if budget > 0:
+            body = _truncate("\n".join(middle), budget)
+            return join(head + [body] + tail)
+
+    truncated = _truncate(text, limit)
+    hashtags = find_hashtags(text)
+    if not hashtags or hashtags[0] in find_hashtags(truncated):
+        # 해시태그가 잘린 범위 밖에 있으면 원래 위치에 그대로 둠
+        return truncated
+    # 끝부분의 해시태그가 잘려 나간 경우에만 맨 뒤에 다시 붙임
+    suffix = f"\n#{hashtags[0]}"
+    return _truncate(text, limit - count_chars(suffix)) + suffix
+
+
+def exceeds_budget(partial_text: str, limit: int = MAX_POST_CHARS, slack: float = SHORTEN_SLACK) -> bool:
+    """
+    스트리밍 중인 부분 출력이 더 이상 게시물 한 개에 들어갈 수 없는지 판단합니다.
+    fit_post가 로컬에서 줄일 수 있는 범위(limit * (1 + slack))를 넘으면 True입니다.
+    해시태그 개수 등 나머지 형식 규칙은 fit_post에서 보정 가능하므로 중단 사유가 아닙니다.
+    """
+    return count_chars(partial_text) > limit * (1 + slack)
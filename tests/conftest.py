@@ -0,0 +1,17 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import run as bench_run
+
+# src 모듈은 임포트 시점에 환경 변수를 읽으므로 테스트 전체에서 가짜 서버 환경을 한 번만 구성
+SERVERS = bench_run.setup_environment(argparse.Namespace(
+    serper_latency=0, openai_latency=0, token_delay=0, long_ratio=0, threads_latency=0, processing_time=0.2,
+))
+os.environ.update({
+    "GENERATION_CACHE": "true",
+    "POST_BUFFER": "false",
+    "JOB_BACKEND": "memory",
+})
@@ -0,0 +1,30 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src import app
+
+
+class Stop(BaseException):
+    pass
+
+
+def test_produce_loop_survives_enqueue_errors(monkeypatch):
+    attempts, sleeps = [], []
+
+    def enqueue(kind, payload, idempotency_key=None):
+        attempts.append(idempotency_key)
+        if len(attempts) <= 2:
+            raise RuntimeError("database is locked")
+        raise Stop()
+
+    monkeypatch.setattr(app, "POST_BUFFER_PRODUCE_INTERVAL", 60)
+    monkeypatch.setattr(app, "POST_BUFFER_PRODUCE_HOURS", "")
+    monkeypatch.setattr(app.jobs, "enqueue", enqueue)
+    # time 모듈 자체를 패치하면 다른 스레드의 sleep까지 바뀌므로 app이 보는 time만 교체
+    monkeypatch.setattr(app, "time", SimpleNamespace(time=time.time, localtime=time.localtime, sleep=sleeps.append))
+    with pytest.raises(Stop):
+        app.produce_loop()
+    assert len(attempts) == 3
+    assert sleeps == [app.PRODUCE_RETRY_BASE, app.PRODUCE_RETRY_BASE * 2]
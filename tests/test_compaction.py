@@ -0,0 +1,11 @@
+from src import compaction
+
+
+def test_oversized_snippet_is_truncated_to_the_budget():
+    snippet = "Chip makers expanded capacity again this quarter as demand kept rising. " * 80
+    results = {"news": [{"title": "AI chips", "snippet": snippet, "date": "2 hours ago"}]}
+    raw_text = f"AI chips: {snippet}"
+    text, stats = compaction.compact(results, "AI chips", raw_text=raw_text, budget=100)
+    assert text != raw_text and text.startswith("- [2 hours ago] AI chips:")
+    assert stats["kept"] == 1
+    assert stats["tokens"] <= 100
@@ -0,0 +1,30 @@
+import time
+
+from src import bot, containers, ratelimit
+
+
+def test_rate_limited_check_is_rescheduled_without_holding_a_thread():
+    poller = containers.ContainerPoller(workers=1)
+    limited = iter([{"status": None, "retry_after": 0.5}, {"status": "FINISHED"}])
+    slow = poller.watch(lambda: next(limited), initial=0.01)
+    time.sleep(0.05)
+    fast = poller.watch(lambda: {"status": "FINISHED"}, initial=0.01)
+    assert fast.result(timeout=1)["waited"] < 0.3
+    result = slow.result(timeout=2)
+    assert result["status"] == "FINISHED" and result["checks"] == 2 and result["waited"] >= 0.5
+
+
+def test_try_acquire_does_not_reserve_tokens():
+    bucket = ratelimit.TokenBucket(rate=10, capacity=1)
+    assert bucket.try_acquire() == 0
+    assert 0 < bucket.try_acquire() <= 0.1
+    assert bucket.snapshot()["tokens"] >= 0
+
+
+def test_non_blocking_container_check_returns_retry_after(monkeypatch):
+    calls = []
+    monkeypatch.setattr(bot.http_client, "request", lambda *args, **kwargs: calls.append(args))
+    bot.limiter.bucket("poll-test", "threads").penalize(60)
+    result = bot.check_container("token", "container", "poll-test", block=False)
+    assert result["status"] is None and result["retry_after"] > 0
+    assert calls == []
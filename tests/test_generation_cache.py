@@ -0,0 +1,41 @@
+import os
+import time
+
+from src import bot, storage
+from src.generation_cache import GenerationCache
+from src.history import get_history
+from src.token_store import get_token_store
+
+NEWS = "- [1 hour ago] OpenAI ships a model: details about the release\n- [2 hours ago] Gemini adds new features"
+
+
+def make_cache(name: str) -> GenerationCache:
+    return GenerationCache(path=storage.data_path(name), similarity=0)
+
+
+def test_variant_assigned_to_storing_account_is_not_served_to_others():
+    cache = make_cache("gen_assigned.db")
+    cache.store("T", NEWS, "m", ["post A"], account="acctA")
+    assert cache.claim("T", NEWS, "m", "acctB") == (None, "exhausted")
+    variant, result = cache.claim("T", NEWS, "m", "acctA")
+    assert (variant["text"], result) == ("post A", "hit")
+
+
+def test_each_variant_is_claimed_by_one_account():
+    cache = make_cache("gen_claims.db")
+    cache.store("T", NEWS, "m", ["post A", "post B", "post C"], account="acctA")
+    texts = [cache.claim("T", NEWS, "m", account)[0]["text"] for account in ("acctB", "acctC")]
+    assert sorted(texts) == ["post B", "post C"]
+    assert cache.claim("T", NEWS, "m", "acctD") == (None, "exhausted")
+
+
+def test_two_accounts_publish_different_texts():
+    get_token_store().save("acctB", "bench", 60 * 24 * 60 * 60, "acctB")
+    topic = f"Shared {time.time()}"
+    results = bot.main([topic], workers=1, accounts=["bench", "acctB"])
+    assert all("error" not in result for result in results), results
+    with get_history()._lock:
+        rows = get_history()._conn.execute("SELECT account, text FROM posts WHERE topic = ?", (topic,)).fetchall()
+    texts = {row["account"]: row["text"] for row in rows}
+    assert set(texts) == {"bench", "acctB"}
+    assert texts["bench"] != texts["acctB"]
@@ -0,0 +1,49 @@
+from src import compaction, storage
+from src.history import PostHistory, simhash
+from src.post_buffer import PostBuffer
+
+NEWS = "OpenAI released a new reasoning model today with better benchmark scores and lower prices"
+POST = "안녕 스치니들! 오늘 AI 소식은 새로운 추론 모델 출시야. #AI 여러분 생각은 어때?"
+
+
+def test_history_sees_rows_written_by_another_instance():
+    path = storage.data_path("history_shared.db")
+    first, second = PostHistory(path), PostHistory(path)
+    assert second.find_post(POST) is None
+
+    post_id = first.record("T", NEWS, POST, account="acctA")
+
+    assert second.find_post(POST) == (post_id, 0)
+    assert second.find_news(NEWS, "acctA") == (post_id, 0)
+    assert second.find_news(NEWS, "acctB") is None
+    # 자기 자신이 기록한 행을 다시 읽어도 중복으로 추가되지 않음
+    assert first.find_post(POST) == (post_id, 0)
+    assert len(first.post_index) == 1
+
+
+def test_simhash_matches_stored_fingerprints():
+    # 이미 DB에 저장된 값과 비교하므로 계산 방식을 바꿔도 결과는 같아야 함
+    assert simhash("OpenAI released a new reasoning model today") == 0x767c772d9e9bb627
+    assert simhash("안녕 스치니들! 오늘 AI 소식은 새로운 추론 모델 출시야. #AI") == 0x4de03e294888532
+    assert simhash("ab") == 0xe52b5f187de1088
+
+
+def compacted_news(hours: int) -> str:
+    results = {"news": [
+        {"title": f"AI headline {index}", "snippet": f"Details about story number {index} in AI.",
+         "date": f"{hours + index} hours ago"}
+        for index in range(5)
+    ]}
+    return compaction.compact(results, "AI")[0]
+
+
+def test_same_headlines_an_hour_later_are_duplicate_news():
+    before, after = compacted_news(1), compacted_news(2)
+    assert before != after
+    history = PostHistory(storage.data_path("history_dates.db"))
+    post_id = history.record("AI", before, POST, account="acctA")
+    assert history.find_news(after, "acctA") == (post_id, 0)
+
+    buffer = PostBuffer(storage.data_path("buffer_dates.db"))
+    buffer.add("acctA", "AI", POST, news=before)
+    assert buffer.has_news("acctA", "AI", after)
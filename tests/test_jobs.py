@@ -0,0 +1,93 @@
+import time
+import threading
+
+from src import jobs
+
+
+def test_stale_worker_cannot_finish_a_reclaimed_job(tmp_path):
+    queue = jobs.SQLiteJobBackend(str(tmp_path / "jobs.db"))
+    job = queue.enqueue("runbot", {})
+    first = queue.claim("worker-1", lease=0.1)
+    time.sleep(0.2)
+    second = queue.claim("worker-2", lease=60)
+    assert second["id"] == job["id"] and second["lease_token"] != first["lease_token"]
+    assert not queue.renew(job["id"], first["lease_token"])
+    assert not queue.complete(job["id"], {"ok": True}, token=first["lease_token"])
+    assert queue.get(job["id"])["status"] == jobs.RUNNING
+    assert queue.complete(job["id"], {"ok": True}, token=second["lease_token"])
+    assert queue.get(job["id"])["status"] == jobs.SUCCEEDED
+
+
+def test_running_job_lease_is_renewed(monkeypatch):
+    queue = jobs.MemoryJobBackend()
+    monkeypatch.setattr(jobs, "_queue", queue)
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0.3)
+    stolen = []
+
+    def slow_handler():
+        time.sleep(1.0)
+        return {"ok": True}
+
+    def steal():
+        time.sleep(0.6)
+        stolen.append(queue.claim("worker-2", lease=60))
+
+    jobs.register_handler("slow", slow_handler)
+    job = jobs.enqueue("slow")
+    thief = threading.Thread(target=steal)
+    thief.start()
+    assert jobs.run_one("worker-1")
+    thief.join()
+    assert stolen == [None]
+    assert queue.get(job["id"])["status"] == jobs.SUCCEEDED
+
+
+def test_run_with_every_task_failing_is_retried(monkeypatch):
+    from src import bot
+
+    queue = jobs.MemoryJobBackend()
+    monkeypatch.setattr(jobs, "_queue", queue)
+    monkeypatch.setattr(bot, "main", lambda topics=None, accounts=None: [
+        {"topic": "AI Trend", "account": "bench", "error": "Serper unavailable"},
+        {"topic": "Robotics", "account": "bench", "error": "Serper unavailable"},
+    ])
+    jobs.register_handler("runbot", bot.run)
+    job = jobs.enqueue("runbot", {"buffered": False, "processes": 1})
+    assert jobs.run_one("worker-1")
+    job = queue.get(job["id"])
+    assert job["status"] == jobs.QUEUED and job["run_at"] > time.time()
+    assert "2/2 tasks failed" in job["error"]
+
+
+def test_run_with_some_tasks_failing_succeeds(monkeypatch):
+    from src import bot
+
+    results = [{"topic": "AI Trend", "account": "bench", "error": "Serper unavailable"},
+               {"topic": "Robotics", "account": "bench", "message": "[+] 게시물 업로드 완료"}]
+    monkeypatch.setattr(bot, "main", lambda topics=None, accounts=None: results)
+    assert bot.run(buffered=False, processes=1)["results"] == results
+
+
+def test_publish_that_must_wait_is_scheduled_as_a_job(tmp_path, monkeypatch):
+    from src import bot, ratelimit
+
+    queue = jobs.MemoryJobBackend()
+    monkeypatch.setattr(jobs, "_queue", queue)
+    monkeypatch.setitem(ratelimit.ENDPOINT_LIMITS, "threads_publish", (250 / 86400, 1))
+    monkeypatch.setattr(bot, "limiter", ratelimit.RateLimiter(ratelimit.BucketStore(str(tmp_path / "ratelimit.db"))))
+    posts = [{"topic": "Scheduling", "text": f"예약 게시 테스트 {word} #Scheduling", "news": word}
+             for word in ("첫 번째 게시물은 바로 올라감", "두 번째 게시물은 다음 자리까지 기다려야 함")]
+
+    started = time.time()
+    assert bot.publish_generated(posts[0], "bench")["message"]
+    scheduled = bot.publish_generated(posts[1], "bench")
+    # 두 번째 게시물은 레인에서 약 346초 잠드는 대신 작업으로 예약되고 곧바로 반환
+    assert time.time() - started < 5
+    assert 300 < scheduled["scheduled_at"] - time.time() <= 86400 / 250
+    job = queue.get(scheduled["job_id"])
+    assert job["kind"] == "publish" and job["run_at"] == scheduled["scheduled_at"]
+    assert queue.claim("worker-1", lease=60) is None
+
+    # 예약 시각에 작업이 실행되면 예약해 둔 토큰으로 기다리지 않고 게시
+    result = bot.publish_scheduled(**job["payload"])
+    assert result["message"] and time.time() - started < 10
@@ -0,0 +1,20 @@
+from src import ratelimit
+
+
+def test_limiters_in_different_processes_share_the_publish_bucket(tmp_path, monkeypatch):
+    monkeypatch.setitem(ratelimit.ENDPOINT_LIMITS, "threads_publish", (250 / 86400, 1))
+    path = str(tmp_path / "ratelimit.db")
+    # 프로세스마다 저장소 연결과 RateLimiter를 따로 가진 것처럼 만듦
+    first = ratelimit.RateLimiter(ratelimit.BucketStore(path))
+    second = ratelimit.RateLimiter(ratelimit.BucketStore(path))
+    assert first.try_acquire("acct", "threads_publish") == 0
+    assert second.try_acquire("acct", "threads_publish") > 300
+    assert second.try_acquire("other", "threads_publish") == 0
+
+
+def test_penalty_is_seen_by_other_processes(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    first = ratelimit.RateLimiter(ratelimit.BucketStore(path))
+    second = ratelimit.RateLimiter(ratelimit.BucketStore(path))
+    first.bucket("acct", "threads").penalize(120)
+    assert 100 < second.delay("acct", "threads") <= 120
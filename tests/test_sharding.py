@@ -0,0 +1,48 @@
+import time
+
+from src import bot, sharding
+
+
+def test_node_shards_keep_each_account_on_one_node():
+    tasks = [(f"acct{account}", f"topic{topic}") for account in range(6) for topic in range(10)]
+    owners = {}
+    for index in range(3):
+        for user_id, _ in sharding.shard_tasks(tasks, index, 3):
+            owners.setdefault(user_id, set()).add(index)
+    assert set(owners) == {user_id for user_id, _ in tasks}
+    assert all(len(nodes) == 1 for nodes in owners.values())
+
+
+def test_sharded_run_publishes_only_from_parent(monkeypatch):
+    calls = []
+    publish_container = bot.publish_container
+
+    def counting_publish(*args, **kwargs):
+        calls.append(args)
+        return publish_container(*args, **kwargs)
+
+    # 자식 프로세스는 spawn으로 새로 시작하므로 이 패치는 부모 프로세스의 게시만 셈
+    monkeypatch.setattr(bot, "publish_container", counting_publish)
+    tasks = [("bench", f"Sharded {time.time()} {index}") for index in range(4)]
+    results = bot.publish_sharded(tasks, processes=2, buffered=False)
+    assert [result.get("message") for result in results] == ["[+] 게시물 업로드 완료"] * len(tasks), results
+    assert len(calls) == len(tasks)
+    assert sharding.get_leases().active() == []
+
+
+def test_held_lease_is_renewed_past_its_ttl(tmp_path):
+    leases = sharding.TaskLeases(str(tmp_path / "leases.db"))
+    assert leases.acquire("publish:a/b", "worker-1", ttl=0.3)
+    time.sleep(0.8)
+    assert not leases.acquire("publish:a/b", "worker-2", ttl=0.3)
+    leases.release("publish:a/b", "worker-1")
+    assert leases.acquire("publish:a/b", "worker-2", ttl=0.3)
+    leases.release("publish:a/b", "worker-2")
+
+
+def test_renew_drops_lease_taken_by_another_worker(tmp_path):
+    leases = sharding.TaskLeases(str(tmp_path / "leases.db"))
+    assert leases.acquire("publish:a/b", "worker-1", ttl=60)
+    leases._conn.execute("UPDATE task_leases SET owner = 'worker-2' WHERE key = 'publish:a/b'")
+    assert leases.renew() == ["publish:a/b"]
+    assert leases.renew() == []
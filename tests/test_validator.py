@@ -0,0 +1,40 @@
+from src import validator
+
+
+def test_truncation_keeps_hashtag_in_place():
+    text = "오늘의 #AI 소식입니다. " + "모델이 더 빨라졌습니다. " * 15
+    fitted = validator.fit_post(text, limit=200)
+    assert fitted.startswith("오늘의 #AI 소식입니다.")
+    assert validator.validate_post(fitted, limit=200)["ok"]
+
+
+def test_truncation_restores_trailing_hashtag():
+    text = "모델이 더 빨라졌습니다. " * 15 + "#AI"
+    fitted = validator.fit_post(text, limit=200)
+    assert fitted.endswith("\n#AI")
+    assert validator.find_hashtags(fitted) == ["AI"]
+    assert validator.validate_post(fitted, limit=200)["ok"]
+
+
+def test_emoji_count_as_utf16_units():
+    assert validator.count_chars("🤣🔥💪" * 10) == 60
+    assert validator.count_chars("안녕 #AI") == 6
+
+
+def test_emoji_heavy_post_fits_in_utf16_units():
+    text = "오늘의 AI 소식 🤣🔥💪 " * 15
+    fitted = validator.fit_post(text, limit=200)
+    assert len(fitted.encode("utf-16-le")) // 2 <= 200
+    assert validator.validate_post(fitted, limit=200)["ok"]
+
+
+def test_dropping_middle_lines_keeps_the_hashtag():
+    lines = (["안녕 스치니들! 오늘도 AI 소식 들고 왔어"]
+             + [f"{index}번째 소식: 요즘 AI 업계에서 정말 많은 일이 벌어지고 있어." for index in range(6)]
+             + ["새 모델 나왔어 #AI 대박 다들 써봤어?", "스하리 하자!"])
+    text = "\n".join(lines)
+    assert 250 < validator.count_chars(text) <= 325
+    fitted = validator.fit_post(text, limit=250)
+    assert fitted.startswith(lines[0]) and "스하리 하자!" in fitted
+    assert validator.find_hashtags(fitted) == ["AI"]
+    assert validator.validate_post(fitted, limit=250)["ok"]